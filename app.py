@@ -4,7 +4,7 @@ from flask import Flask, request, Response
 from flask_caching import Cache
 from flask_cors import CORS
 
-from v3data import IndexNodeClient
+from v3data import IndexNodeClient, block_tracker
 from v3data.pools import pools_from_symbol
 from v3data.bollingerbands import BollingerBand
 from v3data.charts import BaseLimit, Benchmark, DailyChart
@@ -15,8 +15,22 @@ from v3data.users import UserInfo
 from v3data.visor import VisorVaultInfo
 from v3data.toplevel import TopLevelData
 from v3data.dashboard import Dashboard
-from v3data.config import DEFAULT_TIMEZONE, CHARTS_CACHE_TIMEOUT
-from v3data.utils import parse_date
+from v3data.snapshots import SnapshotRefresher
+from v3data.warmup import Warmup
+from v3data.responses import render, ndjson_response, json_response
+from v3data.metrics import registry, start_request, finish_request, stage
+from v3data.memo import request_memo, current_memo
+from v3data.process import after_fork
+from v3data.config import (
+    DEFAULT_TIMEZONE,
+    CHARTS_CACHE_TIMEOUT,
+    CACHE_TYPE,
+    CACHE_MODE,
+    BLOCK_CACHE_TIMEOUT,
+    VISOR_SUBGRAPH_URL
+)
+from v3data.utils import parse_date, parse_period_days
+from v3data.constants import DAYS_IN_PERIOD
 
 logging.basicConfig(
     format='[%(asctime)s:%(levelname)s]:%(message)s',
@@ -24,17 +38,94 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-app = Flask(__name__)
-app.config.from_mapping({'CACHE_TYPE': 'SimpleCache'})
+
+class App(Flask):
+    def full_dispatch_request(self):
+        # Data loads are shared by everything computing the response
+        with request_memo():
+            return super().full_dispatch_request()
+
+    def dispatch_request(self):
+        with stage('calculation'):
+            return super().dispatch_request()
+
+    def make_response(self, rv):
+        # Serialize dict responses with the fast encoder instead of jsonify,
+        # in the format the request asks for
+        if isinstance(rv, dict):
+            with stage('serialization'):
+                rv = render(rv)
+        return super().make_response(rv)
+
+
+app = App(__name__)
+app.config.from_mapping({'CACHE_TYPE': CACHE_TYPE})
 cache = Cache(app)
+snapshots = SnapshotRefresher(app)
+after_fork(snapshots.reset_after_fork)
+warmup = Warmup(app)
+after_fork(warmup.reset_after_fork)
 CORS(app)
 
 
+@app.before_request
+def start_request_timing():
+    start_request()
+
+
+@app.after_request
+def record_request_timing(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    finish_request(route, response.status_code)
+    memo = current_memo()
+    if memo is not None:
+        registry.observe('http_request_upstream_calls', memo.total_upstream_calls, route=route)
+    return response
+
+
+def latest_block():
+    return block_tracker.latest_block(VISOR_SUBGRAPH_URL)
+
+
+def block_cache_key():
+    """Response cache key for the request at the latest indexed block"""
+    return f"block/{latest_block()}{request.full_path}"
+
+
+def cached(timeout=None):
+    """Cache responses until the subgraph indexes a new block in block mode,
+    otherwise for timeout seconds (not at all without a timeout)"""
+    if CACHE_MODE == 'block':
+        return cache.cached(
+            timeout=BLOCK_CACHE_TIMEOUT,
+            key_prefix=block_cache_key,
+            unless=lambda: latest_block() is None
+        )
+    if timeout is None:
+        return lambda f: f
+    return cache.cached(timeout=timeout)
+
+
 @app.route('/')
 def main():
     return "Visor Data"
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/status/ready')
+def ready_status():
+    """200 once this worker's caches are warmed up, 503 before"""
+    # Started by post_worker_init under gunicorn, by the first check under
+    # other servers such as flask run
+    warmup.start(then=snapshots.start)
+    status = warmup.status()
+    return json_response(status, status=200 if status['ready'] else 503)
+
+
 @app.route('/status/subgraph')
 def subgraph_status():
     client = IndexNodeClient()
@@ -43,7 +134,7 @@ def subgraph_status():
 
 @app.route('/charts/bollingerbands/<string:poolAddress>')
 @app.route('/bollingerBandsChartData/<string:poolAddress>')
-@cache.cached(timeout=CHARTS_CACHE_TIMEOUT)
+@cached(CHARTS_CACHE_TIMEOUT)
 def bollingerbands_chart(poolAddress):
     periodHours = int(request.args.get("periodHours", 24))
 
@@ -62,7 +153,8 @@ def bollingerbands_latest(poolAddress):
 
 
 @app.route('/charts/dailyTvl')
-@cache.cached(timeout=CHARTS_CACHE_TIMEOUT)
+@snapshots.serve('/charts/dailyTvl')
+@cached(CHARTS_CACHE_TIMEOUT)
 def daily_tvl_chart_data():
     days = int(request.args.get("days", 20))
 
@@ -72,6 +164,7 @@ def daily_tvl_chart_data():
 
 
 @app.route('/charts/dailyFlows')
+@cached()
 def daily_flows_chart_data():
     days = int(request.args.get("days", 20))
 
@@ -81,6 +174,7 @@ def daily_flows_chart_data():
 
 
 @app.route('/charts/dailyHypervisorFlows/<string:hypervisor_address>')
+@cached()
 def daily_hypervisor_flows_chart_data(hypervisor_address):
     days = int(request.args.get("days", 20))
 
@@ -90,7 +184,7 @@ def daily_hypervisor_flows_chart_data(hypervisor_address):
 
 
 @app.route('/charts/baseRange/<string:hypervisor_address>')
-@cache.cached(timeout=CHARTS_CACHE_TIMEOUT)
+@cached(CHARTS_CACHE_TIMEOUT)
 def base_range_chart(hypervisor_address):
     hours = int(request.args.get("days", 20)) * 24
     hypervisor_address = hypervisor_address.lower()
@@ -103,8 +197,19 @@ def base_range_chart(hypervisor_address):
 
 
 @app.route('/charts/baseRange/all')
-@cache.cached(timeout=CHARTS_CACHE_TIMEOUT)
 def base_range_chart_all():
+    if request.args.get("stream") == "ndjson":
+        # Streamed responses are neither cached nor snapshotted
+        hours = int(request.args.get("days", 20)) * 24
+        baseLimitData = BaseLimit(hours=hours, chart=True)
+        return ndjson_response(baseLimitData.iter_rebalance_ranges())
+
+    return base_range_chart_all_data()
+
+
+@snapshots.serve('/charts/baseRange/all')
+@cached(CHARTS_CACHE_TIMEOUT)
+def base_range_chart_all_data():
     hours = int(request.args.get("days", 20)) * 24
     baseLimitData = BaseLimit(hours=hours, chart=True)
     chart_data = baseLimitData.all_rebalance_ranges()
@@ -144,18 +249,26 @@ def uniswap_pools(token):
 
 
 @app.route('/visr/basicStats')
+@cached()
 def visr_basic_stats():
     visr_info = VisrInfo(days=30)
     return visr_info.output()
 
 
 @app.route('/visr/yield')
+@cached()
 def visr_yield():
-    visr_yield = VisrYield(days=30)
-    return visr_yield.output()
+    try:
+        periods = parse_period_days(request.args.get("periodDays")) or DAYS_IN_PERIOD
+    except ValueError:
+        return Response("periodDays must be comma separated days between 1 and 365", status=400)
+
+    visr_yield = VisrYield(days=max(30, *periods.values()))
+    return visr_yield.output(periods)
 
 
 @app.route('/visr/dailyDistribution')
+@cached()
 def visr_distributions():
     days = int(request.args.get("days", 6))
     timezone = request.args.get("timezone", DEFAULT_TIMEZONE).upper()
@@ -168,6 +281,7 @@ def visr_distributions():
 
 
 @app.route('/eth/dailyDistribution')
+@cached()
 def eth_distributions():
     days = int(request.args.get("days", 6))
     timezone = request.args.get("timezone", DEFAULT_TIMEZONE).upper()
@@ -180,6 +294,7 @@ def eth_distributions():
 
 
 @app.route('/hypervisor/<string:hypervisor_address>/basicStats')
+@cached()
 def hypervisor_basic_stats(hypervisor_address):
     hypervisor = HypervisorData()
     basic_stats = hypervisor.basic_stats(hypervisor_address)
@@ -191,9 +306,15 @@ def hypervisor_basic_stats(hypervisor_address):
 
 
 @app.route('/hypervisor/<string:hypervisor_address>/returns')
+@cached()
 def hypervisor_apy(hypervisor_address):
+    try:
+        periods = parse_period_days(request.args.get("periodDays")) or DAYS_IN_PERIOD
+    except ValueError:
+        return Response("periodDays must be comma separated days between 1 and 365", status=400)
+
     hypervisor = HypervisorData()
-    returns = hypervisor.calculate_returns(hypervisor_address)
+    returns = hypervisor.calculate_returns(hypervisor_address, periods)
 
     if returns:
         return {
@@ -205,6 +326,7 @@ def hypervisor_apy(hypervisor_address):
 
 
 @app.route('/hypervisors/aggregateStats')
+@cached()
 def aggregate_stats():
     top_level = TopLevelData()
     top_level_data = top_level.all_stats()
@@ -217,6 +339,7 @@ def aggregate_stats():
 
 
 @app.route('/hypervisors/recentFees')
+@cached()
 def recent_fees():
     hours = int(request.args.get("hours", 24))
     top_level = TopLevelData()
@@ -229,6 +352,7 @@ def recent_fees():
 
 
 @app.route('/hypervisors/returns')
+@cached()
 def hypervisors_return():
     hypervisor = HypervisorData()
 
@@ -236,6 +360,8 @@ def hypervisors_return():
 
 
 @app.route('/hypervisors/allData')
+@snapshots.serve('/hypervisors/allData')
+@cached()
 def hypervisors_all():
     hypervisor = HypervisorData()
 
@@ -243,6 +369,8 @@ def hypervisors_all():
 
 
 @app.route('/dashboard')
+@snapshots.serve('/dashboard')
+@cached()
 def dashboard():
     period = request.args.get("period", "monthly").lower()
     dashboard = Dashboard(period)
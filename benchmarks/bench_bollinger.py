@@ -0,0 +1,71 @@
+"""Streaming bollinger band engine against the pandas resample/rolling path
+
+Run from the repository root:
+    python -m benchmarks.bench_bollinger [n_swaps]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import swaps
+from v3data.bollingerbands import StreamingBollingerBand
+
+TOTAL_PERIOD_HOURS = 24
+N_INTERVALS = 20
+
+
+def pandas_latest(timestamps, prices):
+    df = pd.DataFrame({'timestamp': timestamps, 'priceDecimal': prices})
+    df['datetime'] = pd.to_datetime(df.timestamp, unit='s')
+    interval = pd.Timedelta(hours=TOTAL_PERIOD_HOURS / N_INTERVALS)
+    df_resampled = df.sort_values('datetime').resample(interval, on='datetime').last().ffill()
+    df_resampled['mid'] = df_resampled.priceDecimal.rolling(N_INTERVALS).mean()
+    df_resampled['std'] = df_resampled.priceDecimal.rolling(N_INTERVALS).std()
+    df_resampled['upper'] = df_resampled['mid'] + 2 * df_resampled['std']
+    df_resampled['lower'] = df_resampled['mid'] - 2 * df_resampled['std']
+    return df_resampled.dropna().tail(1)
+
+
+def timed(function, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_swaps=1_000_000):
+    timestamps, prices = swaps(n_swaps)
+    new_timestamps, new_prices = timestamps[-100:], prices[-100:]
+    history_timestamps, history_prices = timestamps[:-100], prices[:-100]
+
+    def streaming_cold():
+        engine = StreamingBollingerBand(TOTAL_PERIOD_HOURS, N_INTERVALS)
+        engine.update_many(timestamps, prices)
+        return engine.latest()
+
+    engine = StreamingBollingerBand(TOTAL_PERIOD_HOURS, N_INTERVALS)
+    engine.update_many(history_timestamps, history_prices)
+
+    def streaming_incremental():
+        # 100 new swaps folded one at a time, then a lookup
+        for timestamp, price in zip(new_timestamps.tolist(), new_prices.tolist()):
+            engine.update(timestamp, price)
+        return engine.latest()
+
+    pandas_time = timed(pandas_latest, timestamps, prices)
+    cold_time = timed(streaming_cold)
+    incremental_time = timed(streaming_incremental, repeat=1)
+    lookup_time = timed(engine.latest, repeat=1000)
+
+    print(f"{n_swaps:,} swaps, {TOTAL_PERIOD_HOURS}h period, {N_INTERVALS} intervals")
+    print(f"pandas full recompute:        {pandas_time * 1000:10.2f} ms")
+    print(f"streaming cold build:         {cold_time * 1000:10.2f} ms")
+    print(f"streaming +100 swaps:         {incremental_time * 1000:10.2f} ms")
+    print(f"streaming latest() lookup:    {lookup_time * 1e6:10.2f} us")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,62 @@
+"""DailyChart.tvl record assembly against the previous concat based pipeline
+
+Run from the repository root:
+    python -m benchmarks.bench_daily_tvl [n_hypervisors] [n_days]
+"""
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import tvl_day_data
+from v3data.charts import DailyChart
+from v3data.responses import dumps
+
+
+def pandas_tvl(data):
+    df_all = pd.DataFrame()
+    for hypervisor in data:
+        df_hypervisor = pd.DataFrame(hypervisor['dayData'], dtype=np.float64)
+        df_hypervisor['hypervisor'] = hypervisor['id']
+        df_hypervisor['name'] = f"{hypervisor['pool']['token0']['symbol']}-{hypervisor['pool']['token1']['symbol']}"
+        df_all = pd.concat([df_all, df_hypervisor])
+
+    df_all.date = pd.to_datetime(df_all.date, unit='s').dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    df_all.rename(columns={"name": "group", "tvlUSD": "value"}, inplace=True)
+
+    return df_all[['date', 'group', 'value']].to_dict('records')
+
+
+def timed(function, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_hypervisors=1000, n_days=365):
+    data = tvl_day_data(n_hypervisors, n_days)
+
+    assert DailyChart._tvl_records(data) == pandas_tvl(data)
+
+    pandas_time = timed(pandas_tvl, data, repeat=1)
+    records_time = timed(DailyChart._tvl_records, data)
+
+    records = DailyChart._tvl_records(data)
+    record_dicts = list(records)
+    stdlib_time = timed(lambda: json.dumps({'data': record_dicts}, sort_keys=True, separators=(',', ':')))
+    columnar_time = timed(dumps, {'data': records})
+
+    print(f"{n_hypervisors:,} hypervisors x {n_days} days")
+    print(f"pandas concat per hypervisor: {pandas_time * 1000:10.2f} ms")
+    print(f"single pass records:          {records_time * 1000:10.2f} ms")
+    print(f"stdlib json of dicts:         {stdlib_time * 1000:10.2f} ms")
+    print(f"columnar serialization:       {columnar_time * 1000:10.2f} ms")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,62 @@
+"""Price conversion kernels against the scalar functions
+
+Run from the repository root:
+    python -m benchmarks.bench_prices [n_values]
+"""
+import random
+import sys
+import time
+
+import pandas as pd
+
+from v3data.utils import (
+    sqrtPriceX96_to_priceDecimal,
+    sqrtPriceX96_to_priceDecimal_array,
+    tick_to_priceDecimal,
+    tick_to_priceDecimal_array
+)
+
+TOKEN0_DECIMAL = 6
+TOKEN1_DECIMAL = 18
+
+
+def timed(function, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_values=1_000_000):
+    rng = random.Random(0)
+    sqrt_prices = [str(rng.randrange(2 ** 64, 2 ** 160)) for _ in range(n_values)]
+    ticks = [rng.randrange(-887272, 887272) for _ in range(n_values)]
+    sqrt_price_series = pd.Series(sqrt_prices).astype(float)
+    tick_series = pd.Series(ticks)
+
+    scalar_sqrt_time = timed(
+        lambda: sqrt_price_series.apply(sqrtPriceX96_to_priceDecimal, args=(TOKEN0_DECIMAL, TOKEN1_DECIMAL)), repeat=1
+    )
+    float_sqrt_time = timed(sqrtPriceX96_to_priceDecimal_array, sqrt_price_series.values, TOKEN0_DECIMAL, TOKEN1_DECIMAL)
+    string_sqrt_time = timed(sqrtPriceX96_to_priceDecimal_array, sqrt_prices, TOKEN0_DECIMAL, TOKEN1_DECIMAL)
+    exact_sqrt_time = timed(
+        lambda: sqrtPriceX96_to_priceDecimal_array(sqrt_prices, TOKEN0_DECIMAL, TOKEN1_DECIMAL, exact=True), repeat=1
+    )
+    scalar_tick_time = timed(
+        lambda: tick_series.apply(tick_to_priceDecimal, args=(TOKEN0_DECIMAL, TOKEN1_DECIMAL)), repeat=1
+    )
+    array_tick_time = timed(tick_to_priceDecimal_array, tick_series.values, TOKEN0_DECIMAL, TOKEN1_DECIMAL)
+
+    print(f"{n_values:,} values")
+    print(f"sqrtPriceX96 scalar apply:    {scalar_sqrt_time * 1000:10.2f} ms")
+    print(f"sqrtPriceX96 float kernel:    {float_sqrt_time * 1000:10.2f} ms")
+    print(f"sqrtPriceX96 from strings:    {string_sqrt_time * 1000:10.2f} ms")
+    print(f"sqrtPriceX96 exact kernel:    {exact_sqrt_time * 1000:10.2f} ms")
+    print(f"tick scalar apply:            {scalar_tick_time * 1000:10.2f} ms")
+    print(f"tick kernel:                  {array_tick_time * 1000:10.2f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
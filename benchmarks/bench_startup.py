@@ -0,0 +1,59 @@
+"""Worker startup time and memory
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [repeat]
+
+Each scenario runs in a fresh interpreter, as a worker starts:
+- lazy: importing the app, heavy dependencies are loaded on first use
+- loaded: importing the app and loading everything, what a worker paid
+  before imports were lazy and what a preloading master pays once
+- first chart: importing the app and computing a chart with pandas
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    'lazy': "import app",
+    'loaded': "import app\nfrom v3data.process import preload\npreload()",
+    'first chart': (
+        "import app\n"
+        "from benchmarks import synthetic\n"
+        "from v3data.charts import DailyChart\n"
+        "daily = DailyChart(days=30)\n"
+        "data = synthetic.flow_day_data(10, 30)\n"
+        "daily._get_all_flows = lambda: data\n"
+        "daily.asset_flows()"
+    )
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('numpy', 'pandas') if type(sys.modules.get(name)).__name__ == 'module']
+print(json.dumps({{"seconds": elapsed, "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "loaded": heavy}}))
+"""
+
+
+def run_scenario(code):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(code=code)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(repeat=5):
+    for name, code in SCENARIOS.items():
+        runs = [run_scenario(code) for _ in range(repeat)]
+        seconds = statistics.median(run['seconds'] for run in runs)
+        rss = statistics.median(run['max_rss_kib'] for run in runs)
+        loaded = ', '.join(runs[0]['loaded']) or '-'
+        print(f"{name:14} {seconds * 1000:8.1f} ms {rss / 1024:8.1f} MiB  loaded: {loaded}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,231 @@
+"""Timing and peak memory of the calculation layer on synthetic data
+
+Run from the repository root:
+    python -m benchmarks.suite [--scale 1] [--output results.json] [--baseline benchmarks/baseline.json]
+
+Subgraph fetches are replaced with deterministic synthetic data, so only
+the calculations are measured. Each case is timed as the best of --repeat
+runs, then run once more under tracemalloc for its peak memory. With a
+baseline the run fails if any case is slower or uses more memory than the
+baseline by more than --threshold. Timings are only comparable on the same
+machine, record a baseline there first with --save-baseline.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from v3data.bollingerbands import BollingerBand
+from v3data.charts import BaseLimit, Benchmark, DailyChart
+from v3data.charts.benchmark import V2_BASE_POOLS
+from v3data.constants import WETH_ADDRESS
+from v3data.hypervisor import HypervisorData
+from v3data.visor import VisorVaultInfo
+from v3data.visr import VisrCalculations
+
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+DEFAULT_THRESHOLD = 0.25
+# Differences below these are noise whatever the ratio
+MIN_SECONDS_DELTA = 0.002
+MIN_BYTES_DELTA = 64 * 1024
+
+CASES = {}
+
+
+def case(function):
+    """Register a case, called with the scale it returns the function to measure"""
+    CASES[function.__name__] = function
+    return function
+
+
+class SyntheticSwaps:
+    """Stands in for UniV3Data, serving swap price chunks"""
+
+    def __init__(self, timestamps, prices, chunk_size=10000):
+        self.timestamps = timestamps
+        self.prices = prices
+        self.chunk_size = chunk_size
+
+    def iter_pool_prices_since(self, pool, timestamp_start):
+        for start in range(0, len(self.timestamps), self.chunk_size):
+            end = start + self.chunk_size
+            yield self.timestamps[start:end], self.prices[start:end]
+
+
+@case
+def calculate_returns(scale):
+    hypervisor = HypervisorData()
+    data = synthetic.rebalances(1000 * scale)
+    return lambda: hypervisor._calculate_returns(data)
+
+
+@case
+def all_returns(scale):
+    hypervisor = HypervisorData()
+    hypervisor.all_rebalance_data = synthetic.hypervisors_rebalances(100 * scale, 200)
+    return hypervisor._all_returns
+
+
+@case
+def base_range(scale):
+    base_limit = BaseLimit(hours=480, chart=True)
+    hypervisors = [synthetic.base_range_data(100, seed=i) for i in range(10 * scale)]
+    base_limit.pool_hourly = {
+        hypervisor['pool']: synthetic.pool_hour_prices(480, seed=i) for i, hypervisor in enumerate(hypervisors)
+    }
+    return lambda: [base_limit._rebalance_ranges(hypervisor) for hypervisor in hypervisors]
+
+
+@case
+def bollinger_bands(scale):
+    band = BollingerBand(synthetic.address(0, 2), 24)
+    band.client = SyntheticSwaps(*synthetic.swaps(200000 * scale))
+    return band.get_data
+
+
+@case
+def benchmark_chart(scale):
+    benchmark = Benchmark(synthetic.address(0, 1), None, None)
+    data = synthetic.benchmark_data(365 * scale)
+
+    def chart():
+        benchmark.base_token_index = 1
+        benchmark.base_pool = V2_BASE_POOLS[WETH_ADDRESS]
+        return benchmark.chart()
+
+    benchmark.get_data = lambda: data
+    return chart
+
+
+@case
+def daily_tvl(scale):
+    daily = DailyChart(days=365)
+    data = synthetic.tvl_day_data(100 * scale, 365)
+    daily._get_tvl_data = lambda: data
+    return daily.tvl
+
+
+@case
+def daily_asset_flows(scale):
+    daily = DailyChart(days=365)
+    data = synthetic.flow_day_data(100 * scale, 365)
+    daily._get_all_flows = lambda: data
+    return daily.asset_flows
+
+
+@case
+def visr_yield(scale):
+    visr = VisrCalculations(days=365 * scale)
+    visr.data = synthetic.visr_data(365 * scale)
+    return lambda: visr.visr_yield(get_data=False)
+
+
+@case
+def visor_vault(scale):
+    visors = []
+    for i in range(100 * scale):
+        visor = VisorVaultInfo(synthetic.address(i, 3))
+        visor.data = synthetic.visor_data(10, seed=i)
+        visors.append(visor)
+    return lambda: [visor.output(get_data=False) for visor in visors]
+
+
+def measure(function, repeat):
+    """Best wall time of repeat runs and peak traced memory of one more"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def run(scale=1, repeat=3, names=None):
+    results = {}
+    for name in names or CASES:
+        results[name] = measure(CASES[name](scale), repeat)
+    return {
+        "scale": scale,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "results": results
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regressions of results against baseline as (name, metric, baseline, result)"""
+    regressions = []
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric, min_delta in [('seconds', MIN_SECONDS_DELTA), ('peak_bytes', MIN_BYTES_DELTA)]:
+            if result[metric] > base[metric] * (1 + threshold) and result[metric] - base[metric] > min_delta:
+                regressions.append((name, metric, base[metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the calculation layer on synthetic data")
+    parser.add_argument('--scale', type=int, default=1, help="Multiplies the size of all synthetic data")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help="Only run these cases")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed fraction above baseline before failing")
+    parser.add_argument('--save-baseline', action='store_true', help="Write results to the baseline file")
+    args = parser.parse_args(argv)
+
+    results = run(args.scale, args.repeat, args.case)
+
+    for name, result in results['results'].items():
+        print(f"{name:24} {result['seconds'] * 1000:10.2f} ms {result['peak_bytes'] / 2 ** 20:10.2f} MiB")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        return 0
+
+    try:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}")
+        return 0
+
+    if baseline.get('scale') != args.scale:
+        print(f"Baseline is at scale {baseline.get('scale')}, not comparing")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, base, result in regressions:
+        print(f"REGRESSION {name} {metric}: {base:.6g} -> {result:.6g} ({result / base - 1:+.0%})")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""Deterministic synthetic subgraph data for benchmarks
+
+Every generator takes a seed and returns data shaped like the subgraph
+responses the calculation layer consumes. Series end at a fixed offset
+from now rounded down to the hour, as returns and bands are computed
+over windows relative to the current time.
+"""
+import random
+import time
+
+import numpy as np
+
+from v3data.constants import RHYPERVISOR_ADDRESS
+
+HOUR_SECONDS = 60 * 60
+DAY_SECONDS = 24 * HOUR_SECONDS
+
+
+def now_hour():
+    return int(time.time()) // HOUR_SECONDS * HOUR_SECONDS
+
+
+def address(i, prefix=0):
+    return f"0x{prefix:02x}{i:038x}"
+
+
+def rebalances(n_rebalances, seed=0, end=None):
+    """Rebalances of one hypervisor, most recent first, about 4 hours apart"""
+    rng = np.random.default_rng(seed)
+    end = end or now_hour()
+    timestamps = end - np.cumsum(rng.integers(HOUR_SECONDS, 8 * HOUR_SECONDS, n_rebalances))
+    total_amount = rng.uniform(1e5, 1e7, n_rebalances)
+    gross_fees = total_amount * rng.uniform(0, 1e-3, n_rebalances)
+    ticks = 200000 + np.cumsum(rng.integers(-50, 50, n_rebalances))
+    width = rng.integers(600, 3000, n_rebalances)
+
+    return [
+        {
+            "id": f"{seed}-{i}",
+            "timestamp": str(timestamp),
+            "grossFeesUSD": str(fees),
+            "protocolFeesUSD": str(fees / 10),
+            "netFeesUSD": str(fees * 0.9),
+            "totalAmountUSD": str(amount),
+            "tick": str(tick),
+            "baseLower": str(tick - w),
+            "baseUpper": str(tick + w),
+            "limitLower": str(tick - w // 2),
+            "limitUpper": str(tick)
+        }
+        for i, (timestamp, fees, amount, tick, w) in enumerate(zip(
+            timestamps.tolist(), gross_fees.tolist(), total_amount.tolist(), ticks.tolist(), width.tolist()
+        ))
+    ]
+
+
+def hypervisors_rebalances(n_hypervisors, n_rebalances, seed=0):
+    """All hypervisors with their rebalances, as HypervisorData.all_rebalance_data"""
+    return [
+        {"id": address(i, 1), "rebalances": rebalances(n_rebalances, seed=seed + i)}
+        for i in range(n_hypervisors)
+    ]
+
+
+def pool_hour_prices(n_hours, seed=0, end=None):
+    """Hourly pool prices, most recent first, as Pool.hourly_prices gives per pool"""
+    rng = np.random.default_rng(seed)
+    end = end or now_hour()
+    prices = 2000 * np.exp(np.cumsum(rng.normal(0, 0.005, n_hours)))
+    return [
+        {"timestamp": end - hour * HOUR_SECONDS, "price": price}
+        for hour, price in enumerate(prices.tolist())
+    ]
+
+
+def base_range_data(n_rebalances, seed=0):
+    """Reshaped rebalance data of one hypervisor as BaseLimit._rebalance_ranges takes it"""
+    rng = np.random.default_rng(seed)
+    data = rebalances(n_rebalances, seed)
+    for rebalance in data:
+        price = 2000 * float(rng.uniform(0.8, 1.2))
+        rebalance.update({
+            "baseLower": price * 0.9,
+            "baseUpper": price * 1.1,
+            "limitLower": price * 0.95,
+            "limitUpper": price
+        })
+    return {
+        "pool": address(seed, 2),
+        "token0_name": "USDC",
+        "token1_name": "WETH",
+        "base_token_index": 0,
+        "rebalances": [
+            {key: rebalance[key] for key in ['timestamp', 'tick', 'baseLower', 'baseUpper', 'limitLower', 'limitUpper']}
+            for rebalance in data
+        ]
+    }
+
+
+def swaps(n_swaps, seed=0, end=None):
+    """Swap timestamps and prices in order, a few seconds apart"""
+    rng = np.random.default_rng(seed)
+    end = end or now_hour()
+    timestamps = np.cumsum(rng.integers(0, 3, n_swaps))
+    timestamps = end - timestamps[-1] + timestamps
+    prices = 2000 * np.exp(np.cumsum(rng.normal(0, 0.0005, n_swaps)))
+    return timestamps, prices
+
+
+def tvl_day_data(n_hypervisors, n_days, seed=0):
+    """Hypervisors with their daily TVL, as DailyChart._get_tvl_data gives them"""
+    rng = np.random.default_rng(seed)
+    last_date = 1627000000 // DAY_SECONDS * DAY_SECONDS
+    return [
+        {
+            "id": f"0x{i:040x}",
+            "pool": {
+                "token0": {"symbol": f"TKN{i}", "decimals": 18},
+                "token1": {"symbol": "WETH", "decimals": 18}
+            },
+            "dayData": [
+                {
+                    "date": last_date - day * DAY_SECONDS,
+                    "tvl0": str(tvl),
+                    "tvl1": str(tvl),
+                    "tvlUSD": str(tvl)
+                }
+                for day, tvl in enumerate(rng.uniform(1e3, 1e7, n_days).tolist())
+            ]
+        }
+        for i in range(n_hypervisors)
+    ]
+
+
+def flow_day_data(n_hypervisors, n_days, seed=0):
+    """Daily flows of all hypervisors flattened, as DailyChart._get_all_flows gives them"""
+    rng = np.random.default_rng(seed)
+    last_date = 1627000000 // DAY_SECONDS * DAY_SECONDS
+    values = rng.uniform(0, 1e6, (n_hypervisors, n_days, 4)).tolist()
+    return [
+        {
+            "date": str(last_date - day * DAY_SECONDS),
+            "depositedUSD": str(deposited),
+            "withdrawnUSD": str(withdrawn),
+            "protocolFeesCollectedUSD": str(protocol_fees),
+            "feesReinvestedUSD": str(reinvested)
+        }
+        for hypervisor in values
+        for day, (deposited, withdrawn, protocol_fees, reinvested) in enumerate(hypervisor)
+    ]
+
+
+def benchmark_data(n_days, seed=0):
+    """Hypervisor and Uniswap V2 day data, as Benchmark.get_data gives them"""
+    rng = np.random.default_rng(seed)
+    first_date = 1620000000 // DAY_SECONDS * DAY_SECONDS
+    dates = [first_date + day * DAY_SECONDS for day in range(n_days)]
+
+    def walk(scale):
+        return (scale * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))).tolist()
+
+    reserve0, reserve1, eth_reserve0, eth_reserve1, base_reserve0, base_reserve1 = (walk(1e6) for _ in range(6))
+
+    return {
+        "token0_symbol": "TKN",
+        "token1_symbol": "WETH",
+        "hypervisor": [{"date": str(date), "close": str(close)} for date, close in zip(dates, walk(1))],
+        "v2": {
+            "lpDayData": [
+                {
+                    "date": str(date),
+                    "totalSupply": str(supply),
+                    "reserve0": str(r0),
+                    "reserve1": str(r1),
+                    "reserveUSD": str(2 * r0)
+                }
+                for date, supply, r0, r1 in zip(dates, walk(1e4), reserve0, reserve1)
+            ],
+            "ethDayData": [
+                {"date": str(date), "reserve0": str(r0), "reserve1": str(r1)}
+                for date, r0, r1 in zip(dates, eth_reserve0, eth_reserve1)
+            ],
+            "baseDayData": [
+                {"date": str(date), "reserve0": str(r0), "reserve1": str(r1)}
+                for date, r0, r1 in zip(dates, base_reserve0, base_reserve1)
+            ]
+        }
+    }
+
+
+def visr_data(n_days, seed=0):
+    """VISR token day data, as VisrData._get_data gives it"""
+    rng = np.random.default_rng(seed)
+    last_date = 1627000000 // DAY_SECONDS * DAY_SECONDS
+    distributed = rng.uniform(1e21, 1e22, n_days).tolist()
+    return {
+        "visrToken": {
+            "totalSupply": str(10 ** 26),
+            "totalDistributed": str(int(sum(distributed))),
+            "totalDistributedUSD": str(sum(distributed) / 1e18),
+            "totalStaked": str(5 * 10 ** 25)
+        },
+        "visrTokenDayDatas": [
+            {
+                "date": str(last_date - day * DAY_SECONDS),
+                "distributed": str(int(amount)),
+                "distributedUSD": str(amount / 1e18),
+                "totalStaked": str(5 * 10 ** 25)
+            }
+            for day, amount in enumerate(distributed)
+        ],
+        "rewardHypervisor": {"totalVisr": str(5 * 10 ** 25)}
+    }
+
+
+def visor_data(n_shares, seed=0):
+    """One user visor holding shares of n_shares hypervisors, as VisorVaultData._get_data gives it"""
+    # Token amounts beyond 64 bits
+    rng = random.Random(seed)
+
+    hypervisor_shares = []
+    for i in range(n_shares):
+        total_supply = rng.randrange(10 ** 18, 10 ** 21)
+        hypervisor_shares.append({
+            "hypervisor": {
+                "id": address(i, 1),
+                "pool": {"token0": {"decimals": "6"}, "token1": {"decimals": "18"}},
+                "conversion": {
+                    "baseTokenIndex": str(i % 2),
+                    "priceTokenInBase": str(rng.uniform(1e-4, 1e4)),
+                    "priceBaseInUSD": str(rng.uniform(1, 3000))
+                },
+                "totalSupply": str(total_supply),
+                "tvl0": str(rng.randrange(10 ** 9, 10 ** 12)),
+                "tvl1": str(rng.randrange(10 ** 18, 10 ** 21)),
+                "tvlUSD": str(rng.uniform(1e5, 1e7))
+            },
+            "shares": str(total_supply // rng.randrange(2, 1000)),
+            "initialToken0": str(rng.randrange(10 ** 6, 10 ** 9)),
+            "initialToken1": str(rng.randrange(10 ** 15, 10 ** 18)),
+            "initialUSD": str(rng.uniform(1e3, 1e5))
+        })
+
+    return {
+        "visrToken": {"totalStaked": str(5 * 10 ** 25)},
+        "visor": {
+            "owner": {"id": address(seed, 3)},
+            "visrDeposited": str(10 ** 21),
+            "visrEarnedRealized": str(10 ** 19),
+            "hypervisorShares": hypervisor_shares,
+            "rewardHypervisorShares": [
+                {"rewardHypervisor": {"id": RHYPERVISOR_ADDRESS}, "shares": str(10 ** 21)}
+            ]
+        },
+        "rewardHypervisor": {"totalVisr": str(5 * 10 ** 25), "totalSupply": str(4 * 10 ** 25)}
+    }
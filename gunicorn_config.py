@@ -1,3 +1,73 @@
+import glob
+import importlib.util
+import os
+import sqlite3
+
 bind = "0.0.0.0:8080"
 worker_class = "gevent"
 workers = 5
+
+# Import the app once in the master, workers share it copy-on-write.
+# Read here rather than from v3data.config, importing v3data would load
+# requests and ssl before gevent patches them.
+preload_app = os.environ.get('PRELOAD_APP', 'false').lower() == 'true'
+
+if preload_app:
+    # Workers patch after forking, the app imported in the master must
+    # already see the patched modules
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def _config():
+    """v3data.config loaded on its own, without importing the v3data package"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'v3data', 'config.py')
+    spec = importlib.util.spec_from_file_location('_v3data_config', path)
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    return config
+
+
+def on_starting(server):
+    """Start metrics from zero, files of previous runs' workers would be summed in,
+    drop snapshots computed by the previous code and warm up again"""
+    config = _config()
+    for path in glob.glob(os.path.join(config.METRICS_DIR, '*.json')):
+        os.remove(path)
+    if os.path.exists(config.SNAPSHOT_PATH):
+        connection = sqlite3.connect(config.SNAPSHOT_PATH, timeout=30)
+        try:
+            with connection:
+                connection.execute("DELETE FROM snapshots")
+        except sqlite3.OperationalError:
+            # No snapshots table yet
+            pass
+        finally:
+            connection.close()
+    try:
+        os.remove(config.WARMUP_MARKER_PATH)
+    except FileNotFoundError:
+        pass
+
+
+def when_ready(server):
+    """Load heavy modules and read-only tables before the workers are forked"""
+    if server.cfg.preload_app:
+        from v3data.process import preload
+        preload()
+
+
+def post_worker_init(worker):
+    """Warm up caches once per host, then keep endpoint snapshots fresh,
+    only one worker at a time refreshes"""
+    from v3data.process import reset_after_fork
+    from app import snapshots, warmup
+    if worker.cfg.preload_app:
+        reset_after_fork()
+    warmup.start(then=snapshots.start)
+
+
+def worker_exit(server, worker):
+    """Keep the final counts of the worker for /metrics"""
+    from v3data.metrics import registry
+    registry.flush()
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+from v3data import SubgraphClient
+from v3data.aio import AsyncSubgraphClient, run_concurrently
+
+
+def test_overlapping_calls():
+    # Both fan-outs only finish if all four functions run at the same time
+    barrier = threading.Barrier(4, timeout=5)
+    results = {}
+
+    def fan_out(name):
+        results[name] = run_concurrently(*[lambda i=i: (barrier.wait(), f"{name}{i}")[1] for i in range(2)])
+
+    threads = [threading.Thread(target=fan_out, args=(name,)) for name in 'ab']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {'a': ['a0', 'a1'], 'b': ['b0', 'b1']}
+
+
+def test_nested_and_inside_running_loop():
+    # Greenlets share one OS thread, where another request's loop may be running
+    async def request():
+        return run_concurrently(lambda: run_concurrently(lambda: 1, lambda: 2), lambda: 3)
+
+    assert asyncio.run(request()) == [[1, 2], 3]
+
+
+QUERY = """
+query swaps($paginate: String!){
+    swaps(first: 2, orderBy: id, orderDirection: asc, where: {id_gt: $paginate}){ id }
+}
+"""
+
+
+def test_async_paginate_query():
+    swaps = [{"id": f"0x{i:02x}"} for i in range(5)]
+    requests = []
+
+    def post(params):
+        requests.append(dict(params['variables']))
+        later = [swap for swap in swaps if swap['id'] > params['variables']['paginate']]
+        return {"data": {"swaps": later[:2]}}
+
+    client = SubgraphClient("http://localhost:8000/subgraphs/name/visorfinance/visor")
+    client._post = post
+    variables = {"paginate": ""}
+
+    assert asyncio.run(AsyncSubgraphClient(client).paginate_query(QUERY, "id", variables)) == swaps
+    assert [request['paginate'] for request in requests] == ["", "0x01", "0x03", "0x04"]
+    assert requests[0]['orderBy'] == "id"
+    # Same pages as the synchronous client
+    assert client.paginate_query(QUERY, "id", variables) == swaps
+    assert variables == {"paginate": ""}
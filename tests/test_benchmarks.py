@@ -0,0 +1,26 @@
+from benchmarks.suite import compare, run
+
+
+def results(seconds, peak_bytes):
+    return {"scale": 1, "results": {"case": {"seconds": seconds, "peak_bytes": peak_bytes}}}
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = results(1.0, 10 * 2 ** 20)
+
+    assert compare(results(1.2, 10 * 2 ** 20), baseline, 0.25) == []
+    assert compare(results(1.3, 10 * 2 ** 20), baseline, 0.25) == [("case", "seconds", 1.0, 1.3)]
+    assert compare(results(0.5, 20 * 2 ** 20), baseline, 0.25) == [("case", "peak_bytes", 10 * 2 ** 20, 20 * 2 ** 20)]
+
+
+def test_compare_ignores_noise_and_new_cases():
+    # Large ratio but tiny absolute difference
+    assert compare(results(0.0002, 1000), results(0.0001, 100), 0.25) == []
+    assert compare(results(9.0, 1000), {"results": {}}, 0.25) == []
+
+
+def test_run_records_time_and_memory():
+    output = run(scale=1, repeat=1, names=['visr_yield', 'calculate_returns'])
+    for result in output['results'].values():
+        assert result['seconds'] > 0
+        assert result['peak_bytes'] > 0
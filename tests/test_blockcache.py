@@ -0,0 +1,77 @@
+import pytest
+from v3data.blockcache import subgraph_name, BlockTracker, BlockQueryCache
+
+
+@pytest.mark.parametrize("url, name", [
+    ("https://api.thegraph.com/subgraphs/name/visorfinance/visor", "visorfinance/visor"),
+    ("https://api.thegraph.com/subgraphs/name/visorfinance/visor/", "visorfinance/visor"),
+    ("https://api.thegraph.com/index-node/graphql", None),
+])
+def test_subgraph_name(url, name):
+    assert subgraph_name(url) == name
+
+
+def test_block_polled_once_per_interval():
+    calls = []
+
+    def fetch_block(name):
+        calls.append(name)
+        return 100 + len(calls)
+
+    tracker = BlockTracker(fetch_block, poll_interval=60)
+    url = "https://api.thegraph.com/subgraphs/name/visorfinance/visor"
+    assert tracker.latest_block(url) == 101
+    assert tracker.latest_block(url) == 101
+    assert calls == ["visorfinance/visor"]
+
+    tracker.poll_interval = 0
+    assert tracker.latest_block(url) == 102
+
+
+def test_failed_poll_keeps_last_block():
+    blocks = iter([5])
+
+    def fetch_block(name):
+        return next(blocks)
+
+    tracker = BlockTracker(fetch_block, poll_interval=0)
+    url = "https://api.thegraph.com/subgraphs/name/visorfinance/visor"
+    assert tracker.latest_block(url) == 5
+    assert tracker.latest_block(url) == 5
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = BlockQueryCache(max_entries=2)
+    cache.set(('a', 1), b'a')
+    cache.set(('b', 1), b'b')
+    cache.get(('a', 1))
+    cache.set(('c', 1), b'c')
+
+    assert cache.get(('a', 1)) == b'a'
+    assert cache.get(('b', 1)) is None
+    assert cache.get(('c', 1)) == b'c'
+
+
+def test_query_results_cached_until_block_advances(monkeypatch):
+    import v3data
+
+    block = {'number': 1}
+    fetches = []
+
+    class Client(v3data.SubgraphClient):
+        def _fetch(self, params):
+            fetches.append(params)
+            return b'{"data": {"block": %d}}' % block['number']
+
+    monkeypatch.setattr(v3data, 'CACHE_MODE', 'block')
+    monkeypatch.setattr(v3data, '_block_query_cache', BlockQueryCache(16))
+    monkeypatch.setattr(v3data, 'block_tracker', BlockTracker(lambda name: block['number'], 0))
+
+    client = Client("https://api.thegraph.com/subgraphs/name/visorfinance/visor")
+    assert client.query("{ block }") == {'data': {'block': 1}}
+    assert client.query("{ block }") == {'data': {'block': 1}}
+    assert len(fetches) == 1
+
+    block['number'] = 2
+    assert client.query("{ block }") == {'data': {'block': 2}}
+    assert len(fetches) == 2
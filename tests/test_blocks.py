@@ -0,0 +1,62 @@
+import numpy as np
+
+from v3data.blocks import BlockIndex, BlockSegment
+
+
+class FakeChain:
+    def __init__(self, n_blocks, missing=()):
+        rng = np.random.default_rng(1)
+        self.timestamps = 1600000000 + np.cumsum(rng.integers(1, 30, n_blocks))
+        self.missing = set(missing)
+        self.range_calls = 0
+        self.after_calls = 0
+
+    def fetch_range(self, start, end):
+        self.range_calls += 1
+        return [
+            (number, int(self.timestamps[number]))
+            for number in range(start, min(end, len(self.timestamps)))
+            if number not in self.missing
+        ]
+
+    def fetch_after(self, timestamp):
+        self.after_calls += 1
+        number = int(np.searchsorted(self.timestamps, timestamp, side='right'))
+        return number, int(self.timestamps[number])
+
+    def block_after(self, timestamp):
+        return int(np.searchsorted(self.timestamps, timestamp, side='right'))
+
+
+def test_segment_lookup():
+    segment = BlockSegment(100, [10, 20, 30])
+    assert segment.block_after(10) == 101
+    assert segment.block_after(29) == 102
+    # Earlier or later blocks are not in the segment
+    assert segment.block_after(5) is None
+    assert segment.block_after(30) is None
+
+
+def test_lookups_match_chain_with_few_fetches():
+    chain = FakeChain(100000)
+    index = BlockIndex(chain.fetch_range, chain.fetch_after, segment_size=1000)
+
+    rng = np.random.default_rng(2)
+    center = int(chain.timestamps[50000])
+    timestamps = rng.integers(center - 5000, center + 5000, 2000).tolist()
+
+    for timestamp in timestamps:
+        assert index.block_after(timestamp) == chain.block_after(timestamp)
+
+    assert chain.after_calls == 1
+    assert chain.range_calls < 10
+
+
+def test_gaps_fall_back_to_subgraph():
+    chain = FakeChain(5000, missing=range(2000, 3000))
+    index = BlockIndex(chain.fetch_range, chain.fetch_after, segment_size=5000)
+    index.add_checkpoint(0, int(chain.timestamps[0]))
+
+    timestamp = int(chain.timestamps[2500])
+    assert index.block_after(timestamp) == 2501
+    assert chain.after_calls == 1
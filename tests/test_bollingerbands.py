@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+from v3data.bollingerbands import BollingerBand, StreamingBollingerBand
+
+
+def pandas_bands(timestamps, prices, total_period_hours, n_intervals):
+    """Reference implementation following BollingerBand.get_data"""
+    df = pd.DataFrame({'timestamp': timestamps, 'priceDecimal': prices})
+    df['datetime'] = pd.to_datetime(df.timestamp, unit='s')
+
+    interval = pd.Timedelta(hours=total_period_hours / n_intervals)
+    df_resampled = df.sort_values('datetime', kind='stable').resample(interval, on='datetime').last()
+    df_resampled = df_resampled.ffill()
+    df_resampled['mid'] = df_resampled.priceDecimal.rolling(n_intervals).mean()
+    df_resampled['std'] = df_resampled.priceDecimal.rolling(n_intervals).std()
+    df_resampled['upper'] = df_resampled['mid'] + 2 * df_resampled['std']
+    df_resampled['lower'] = df_resampled['mid'] - 2 * df_resampled['std']
+    df_resampled.dropna(inplace=True)
+
+    return df_resampled[['priceDecimal', 'mid', 'upper', 'lower']]
+
+
+@pytest.fixture
+def swaps():
+    rng = np.random.default_rng(7)
+    start = 1627000000
+    # Bursts of activity separated by quiet periods longer than a bucket
+    gaps = rng.exponential(120, 5000).astype(np.int64) + 1
+    gaps[rng.integers(0, 5000, 20)] += 6 * 3600
+    timestamps = start + np.cumsum(gaps)
+    prices = 2000 * np.exp(np.cumsum(rng.normal(0, 0.002, 5000)))
+    return timestamps, prices
+
+
+@pytest.mark.parametrize("total_period_hours, n_intervals", [(24, 20), (7, 20), (48, 10)])
+def test_streaming_matches_pandas(swaps, total_period_hours, n_intervals):
+    timestamps, prices = swaps
+    expected = pandas_bands(timestamps, prices, total_period_hours, n_intervals)
+
+    engine = StreamingBollingerBand(total_period_hours, n_intervals, keep_history=True)
+    for timestamp, price in zip(timestamps, prices):
+        engine.update(timestamp, price)
+    history = np.array([row[1:] for row in engine.bands()])
+
+    expected_ns = expected.index.values.astype('datetime64[ns]').astype(np.int64).tolist()
+    assert [row[0] for row in engine.bands()] == expected_ns
+    np.testing.assert_allclose(history, expected.values, rtol=1e-9, atol=1e-9)
+
+
+def test_bulk_updates_match_single_updates(swaps):
+    timestamps, prices = swaps
+    single = StreamingBollingerBand(24, 20)
+    for timestamp, price in zip(timestamps, prices):
+        single.update(timestamp, price)
+
+    bulk = StreamingBollingerBand(24, 20)
+    for chunk in np.array_split(np.arange(len(timestamps)), 7):
+        bulk.update_many(timestamps[chunk], prices[chunk])
+
+    assert bulk.latest()['datetime'] == single.latest()['datetime']
+    for key in ['priceDecimal', 'mid', 'upper', 'lower']:
+        assert bulk.latest()[key] == pytest.approx(single.latest()[key], rel=1e-12)
+
+
+def test_latest_matches_last_pandas_row(swaps):
+    timestamps, prices = swaps
+    expected = pandas_bands(timestamps, prices, 24, 20).tail(1).reset_index().to_dict('records')[0]
+
+    engine = StreamingBollingerBand(24, 20)
+    engine.update_many(timestamps, prices)
+    latest = engine.latest()
+
+    assert latest['datetime'] == expected['datetime']
+    for key in ['priceDecimal', 'mid', 'upper', 'lower']:
+        assert latest[key] == pytest.approx(expected[key], rel=1e-9)
+
+
+def test_out_of_order_swaps_rejected():
+    engine = StreamingBollingerBand(24, 20)
+    engine.update(1627000000, 1.0)
+    with pytest.raises(ValueError):
+        engine.update(1626000000, 1.0)
+
+
+class StreamingClient:
+    """Serves swap prices in chunks like UniV3Data.iter_pool_prices_since"""
+
+    def __init__(self, timestamps, prices, chunk_size):
+        self.timestamps = timestamps
+        self.prices = prices
+        self.chunk_size = chunk_size
+
+    def iter_pool_prices_since(self, pool_address, timestamp_start):
+        for start in range(0, len(self.timestamps), self.chunk_size):
+            yield self.timestamps[start:start + self.chunk_size], self.prices[start:start + self.chunk_size]
+
+    def get_stored_pool(self, pool_address):
+        return {'token0': {'symbol': 'USDC'}, 'token1': {'symbol': 'WETH'}}
+
+
+def test_chart_data_folds_streamed_chunks(swaps):
+    timestamps, prices = swaps
+    expected = pandas_bands(timestamps, prices, 24, 20)
+
+    bband = BollingerBand("0xpool", 24)
+    bband.client = StreamingClient(timestamps, prices, chunk_size=333)
+    chart_data = list(bband.chart_data())
+
+    assert [row['date'] for row in chart_data] == expected.index.strftime('%Y-%m-%dT%H:%M:%SZ').tolist()
+    np.testing.assert_allclose(
+        [[row['value'], row['max'], row['min']] for row in chart_data],
+        expected[['priceDecimal', 'upper', 'lower']].values,
+        rtol=1e-9
+    )
+    assert chart_data[0]['group'] == 'USDC-WETH'
+
+
+class BatchClient(StreamingClient):
+    """Serves one batch of swap prices per call, whatever the start"""
+
+    def __init__(self, batches):
+        self.batches = iter(batches)
+
+    def get_pool_prices_since(self, pool_address, timestamp_start):
+        return next(self.batches)
+
+
+def test_latest_bands_skips_swaps_already_fed(swaps):
+    timestamps, prices = swaps
+    expected = pandas_bands(timestamps, prices, 24, 20).tail(1).reset_index().to_dict('records')[0]
+
+    bband = BollingerBand("0xlatestbandstest", 24)
+    # The second batch overlaps the first, as if fed by another request meanwhile
+    bband.client = BatchClient([
+        (timestamps[:3000], prices[:3000]),
+        (timestamps[2000:], prices[2000:])
+    ])
+    bband.latest_bands()
+    latest = bband.latest_bands()['bands']
+
+    assert latest['datetime'] == expected['datetime'].strftime('%Y-%m-%dT%H:%M:%SZ')
+    assert latest['upper'] == pytest.approx(expected['upper'], rel=1e-9)
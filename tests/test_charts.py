@@ -0,0 +1,30 @@
+from v3data.charts import DailyChart
+
+
+def test_tvl_records_flattened_in_order():
+    data = [
+        {
+            "id": "0x1",
+            "pool": {"token0": {"symbol": "USDC"}, "token1": {"symbol": "WETH"}},
+            "dayData": [
+                {"date": 1627084800, "tvlUSD": "20.5"},
+                {"date": 1626998400, "tvlUSD": "10"}
+            ]
+        },
+        {
+            "id": "0x2",
+            "pool": {"token0": {"symbol": "VISR"}, "token1": {"symbol": "WETH"}},
+            "dayData": []
+        },
+        {
+            "id": "0x3",
+            "pool": {"token0": {"symbol": "WBTC"}, "token1": {"symbol": "WETH"}},
+            "dayData": [{"date": "1627084800", "tvlUSD": "1.25"}]
+        }
+    ]
+
+    assert DailyChart._tvl_records(data) == [
+        {"date": "2021-07-24T00:00:00Z", "group": "USDC-WETH", "value": 20.5},
+        {"date": "2021-07-23T00:00:00Z", "group": "USDC-WETH", "value": 10.0},
+        {"date": "2021-07-24T00:00:00Z", "group": "WBTC-WETH", "value": 1.25}
+    ]
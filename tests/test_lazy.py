@@ -0,0 +1,58 @@
+import subprocess
+import sys
+import threading
+
+from v3data import process
+from v3data.lazy import lazy_import
+from v3data.singleflight import SingleFlight
+
+SLOW_MODULE = """
+import time
+loads = globals().get('loads', 0) + 1
+time.sleep(0.05)
+value = 42
+"""
+
+
+def test_app_import_leaves_heavy_modules_unloaded():
+    code = (
+        "import sys, app\n"
+        "print(*[type(sys.modules.get(name)).__name__ for name in ('numpy', 'pandas')])"
+    )
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    assert output.split() == ['_LazyModule', '_LazyModule']
+
+
+def test_loaded_once_on_first_use_across_threads(tmp_path, monkeypatch):
+    (tmp_path / 'slow_module.py').write_text(SLOW_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'slow_module', raising=False)
+
+    module = lazy_import('slow_module')
+    # type() does not trigger loading, attribute access does
+    assert type(module).__name__ == '_LazyModule'
+
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(module.value)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert values == [42] * 4
+    assert module.loads == 1
+    assert lazy_import('slow_module') is module
+
+
+def test_reset_after_fork(monkeypatch):
+    monkeypatch.setattr(process, '_resets', [])
+    inflight = SingleFlight()
+    process.after_fork(inflight.reset_after_fork)
+
+    lock = inflight._lock
+    lock.acquire()
+    # Forked while the master held the lock
+    process.reset_after_fork()
+
+    assert inflight._lock is not lock
+    assert inflight.do('key', lambda: 1) == 1
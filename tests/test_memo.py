@@ -0,0 +1,92 @@
+from functools import partial
+
+import pytest
+
+import v3data
+from v3data import VisorClient, UniswapV3Client
+from v3data.aio import run_concurrently
+from v3data.memo import request_memo
+from v3data.toplevel import TopLevelData
+from v3data.visr import VisrPrice, ProtocolFeesCalculations
+
+POOL = {"sqrtPrice": str(2 ** 96), "token0": {"symbol": "VISR", "decimals": "18"},
+        "token1": {"symbol": "WETH", "decimals": "18"}}
+REBALANCES = [
+    {"timestamp": "2000000000", "grossFeesUSD": "20", "protocolFeesUSD": "2", "netFeesUSD": "18"},
+    {"timestamp": "2000000000", "grossFeesUSD": "10", "protocolFeesUSD": "1", "netFeesUSD": "9"}
+]
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Requests sent to the subgraphs"""
+    sent = []
+
+    def post(url, json):
+        sent.append(url)
+        if 'visrPrice' in json['query']:
+            data = {"pool": POOL, "bundle": {"ethPriceUSD": "2000"}}
+        else:
+            data = {"uniswapV3Rebalances": REBALANCES}
+        return Response(v3data.json.dumps({"data": data}).encode())
+
+    monkeypatch.setattr(v3data, 'CACHE_MODE', 'ttl')
+    monkeypatch.setattr(v3data.session, 'post', post)
+    return sent
+
+
+def load_all():
+    prices = [VisrPrice().output(), VisrPrice().output()]
+
+    protocol_fees = ProtocolFeesCalculations(days=7)
+    protocol_fees.data = {"uniswapV3Rebalances": REBALANCES, "visrToken": {"totalStaked": str(10 ** 24)}}
+    collected = protocol_fees.collected_fees(get_data=False)
+
+    fees = TopLevelData().recent_fees()
+    return prices, collected, fees
+
+
+def test_loads_shared_within_request(upstream):
+    with request_memo() as memo:
+        prices, collected, fees = load_all()
+
+    assert prices[0] == prices[1] == {"visr_in_usdc": 2000, "visr_in_eth": 1}
+    assert collected['daily']['collected_visr'] == pytest.approx(3 / 2000)
+    assert fees['grossFeesVISR'] == pytest.approx(30 / 2000)
+
+    # One VISR price and one rebalances query
+    assert memo.total_upstream_calls == 2
+    assert memo.upstream_calls[UniswapV3Client()._subgraph] == 1
+    assert memo.upstream_calls[VisorClient()._subgraph] == 1
+    assert len(upstream) == 2
+
+
+def test_loads_repeated_outside_request(upstream):
+    load_all()
+    # Every VISR price is fetched again
+    assert len(upstream) == 5
+
+    # Each request loads its own data
+    with request_memo():
+        load_all()
+    with request_memo():
+        load_all()
+    assert len(upstream) == 9
+
+
+def test_shared_across_threads_and_copied_per_caller(upstream):
+    client = VisorClient()
+    query = "{ uniswapV3Rebalances { timestamp } }"
+
+    with request_memo() as memo:
+        results = run_concurrently(*[partial(client.query, query)] * 4)
+        results[0]['data']['uniswapV3Rebalances'].clear()
+        again = client.query(query)
+
+    assert memo.total_upstream_calls == 1
+    assert again['data']['uniswapV3Rebalances'] == REBALANCES
@@ -0,0 +1,74 @@
+import time
+
+import gunicorn_config
+from v3data import metrics as metrics_module
+from v3data.metrics import Metrics, query_fingerprint
+
+
+def test_fingerprint_ignores_formatting():
+    query = """
+    query hypervisorDaily($days: Int!){
+        uniswapV3Hypervisors(first: 1000){ id }
+    }
+    """
+    fingerprint = query_fingerprint(query)
+    assert fingerprint.startswith("hypervisorDaily:")
+    assert query_fingerprint(' '.join(query.split())) == fingerprint
+    assert query_fingerprint(query.replace("1000", "10")) != fingerprint
+
+
+def test_workers_summed_in_exposition(tmp_path):
+    # One instance per worker process
+    worker1 = Metrics(str(tmp_path), flush_interval=0)
+    worker2 = Metrics(str(tmp_path), flush_interval=0)
+
+    worker1.observe('subgraph_request_seconds', 0.02, subgraph="visorfinance/visor", query="q:1")
+    worker2.observe('subgraph_request_seconds', 3, subgraph="visorfinance/visor", query="q:1")
+    worker2.inc('http_requests_total', route='/dashboard', status='200')
+    worker2.inc('http_requests_total', route='/dashboard', status='200')
+
+    lines = worker1.render().splitlines()
+
+    assert "# TYPE subgraph_request_seconds histogram" in lines
+    labels = 'query="q:1",subgraph="visorfinance/visor"'
+    assert f'subgraph_request_seconds_bucket{{{labels},le="0.01"}} 0' in lines
+    assert f'subgraph_request_seconds_bucket{{{labels},le="0.025"}} 1' in lines
+    assert f'subgraph_request_seconds_bucket{{{labels},le="5"}} 2' in lines
+    assert f'subgraph_request_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f'subgraph_request_seconds_sum{{{labels}}} 3.02' in lines
+    assert f'subgraph_request_seconds_count{{{labels}}} 2' in lines
+    assert 'http_requests_total{route="/dashboard",status="200"} 2' in lines
+
+
+def test_files_cleared_at_server_start(tmp_path, monkeypatch):
+    worker = Metrics(str(tmp_path), flush_interval=0)
+    worker.inc('http_requests_total', route='/dashboard', status='200')
+    worker.flush()
+
+    monkeypatch.setenv('METRICS_DIR', str(tmp_path))
+    monkeypatch.setenv('SNAPSHOT_PATH', str(tmp_path / 'snapshots.sqlite'))
+    monkeypatch.setenv('WARMUP_MARKER_PATH', str(tmp_path / 'warmup.json'))
+    gunicorn_config.on_starting(None)
+
+    # Workers of the new server start from zero
+    assert 'http_requests_total{' not in Metrics(str(tmp_path)).render()
+
+
+def test_request_stages(tmp_path, monkeypatch):
+    recorder = Metrics(str(tmp_path), flush_interval=0)
+    monkeypatch.setattr(metrics_module, 'registry', recorder)
+
+    metrics_module.start_request()
+    with metrics_module.stage('calculation'):
+        metrics_module.add_stage_time('subgraph', 0.05)
+        time.sleep(0.06)
+    metrics_module.finish_request('/dashboard', 200)
+
+    stages = {
+        dict(labels)['stage']: sample[-2]
+        for (name, labels), sample in recorder.collect().items()
+        if name == 'http_request_stage_seconds'
+    }
+    assert set(stages) == {'calculation', 'subgraph', 'total'}
+    assert stages['subgraph'] == 0.05
+    assert 0 < stages['calculation'] < stages['total']
@@ -0,0 +1,86 @@
+import random
+import pytest
+from v3data import SubgraphClient, PAGE_SIZE
+
+
+QUERY = """
+query swaps($rangeStart: Int!, $rangeEnd: Int!){
+    swaps(
+        first: 1000
+        orderBy: timestamp
+        orderDirection: asc
+        where: {
+            timestamp_gte: $rangeStart
+            timestamp_lt: $rangeEnd
+        }
+    ){
+        id
+        timestamp
+    }
+}
+"""
+
+
+class InMemoryClient(SubgraphClient):
+    """Serves range queries from a list of entities"""
+
+    def __init__(self, entities):
+        super().__init__("http://localhost")
+        self.entities = sorted(entities, key=lambda entity: (int(entity['timestamp']), entity['id']))
+        self.requests = 0
+
+    def query(self, query, variables=None):
+        self.requests += 1
+        page = [
+            entity for entity in self.entities
+            if variables['rangeStart'] <= int(entity['timestamp']) < variables['rangeEnd']
+        ][:PAGE_SIZE]
+        return {'data': {'swaps': page}}
+
+
+@pytest.fixture
+def entities():
+    rng = random.Random(42)
+    timestamps = sorted(rng.randint(0, 100000) for _ in range(7500))
+    # Dense burst with several swaps per second
+    timestamps += [50000 + i // 5 for i in range(2000)]
+    return [
+        {"id": f"0x{i:06x}", "timestamp": str(timestamp)}
+        for i, timestamp in enumerate(timestamps)
+    ]
+
+
+@pytest.mark.parametrize("partitions", [None, 1, 3, 8])
+def test_paginate_range_query_matches_serial(entities, partitions):
+    client = InMemoryClient(entities)
+    serial = InMemoryClient(entities).paginate_range_query(QUERY, 'timestamp', 0, 100001, partitions=1)
+    result = client.paginate_range_query(QUERY, 'timestamp', 0, 100001, partitions=partitions)
+
+    assert result == serial
+    assert result == client.entities
+
+
+def test_paginate_range_query_single_page():
+    entities = [{"id": str(i), "timestamp": str(i)} for i in range(10)]
+    client = InMemoryClient(entities)
+
+    assert client.paginate_range_query(QUERY, 'timestamp', 0, 100) == entities
+    assert client.requests == 1
+
+
+def test_paginate_range_query_missing_variable():
+    client = InMemoryClient([])
+    with pytest.raises(ValueError):
+        client.paginate_range_query("{ swaps { id } }", 'timestamp', 0, 100)
+
+
+def test_iter_range_pages_streams_pages(entities):
+    client = InMemoryClient(entities)
+    pages = client.iter_range_pages(QUERY, 'timestamp', 0, 100001)
+
+    first_page = next(pages)
+    assert client.requests == 1
+    assert len(first_page) == PAGE_SIZE
+
+    streamed = first_page + [entity for page in pages for entity in page]
+    assert streamed == client.entities
@@ -0,0 +1,47 @@
+import random
+from fractions import Fraction
+
+import numpy as np
+import pytest
+from v3data.utils import (
+    sqrtPriceX96_to_priceDecimal,
+    sqrtPriceX96_to_priceDecimal_array,
+    tick_to_priceDecimal,
+    tick_to_priceDecimal_array
+)
+
+
+@pytest.fixture
+def sqrt_prices():
+    rng = random.Random(11)
+    return [str(rng.randrange(2 ** 64, 2 ** 160)) for _ in range(1000)]
+
+
+@pytest.mark.parametrize("token0_decimal, token1_decimal", [(6, 18), (18, 6), (18, 18)])
+def test_sqrt_price_array_matches_scalar(sqrt_prices, token0_decimal, token1_decimal):
+    expected = [sqrtPriceX96_to_priceDecimal(float(price), token0_decimal, token1_decimal) for price in sqrt_prices]
+    actual = sqrtPriceX96_to_priceDecimal_array(sqrt_prices, token0_decimal, token1_decimal)
+    np.testing.assert_allclose(actual, expected, rtol=1e-15)
+
+
+@pytest.mark.parametrize("token0_decimal, token1_decimal", [(6, 18), (18, 6), (8, 18)])
+def test_sqrt_price_exact_is_correctly_rounded(sqrt_prices, token0_decimal, token1_decimal):
+    expected = [
+        float(Fraction(int(price) ** 2 * 10 ** token0_decimal, 2 ** 192 * 10 ** token1_decimal))
+        for price in sqrt_prices
+    ]
+    actual = sqrtPriceX96_to_priceDecimal_array(sqrt_prices, token0_decimal, token1_decimal, exact=True)
+    assert actual.tolist() == expected
+
+
+def test_tick_array_matches_scalar():
+    rng = random.Random(5)
+    ticks = [rng.randrange(-887272, 887272) for _ in range(1000)]
+    expected = [tick_to_priceDecimal(tick, 6, 18) for tick in ticks]
+    np.testing.assert_allclose(tick_to_priceDecimal_array(ticks, 6, 18), expected, rtol=1e-14)
+
+
+def test_empty_arrays():
+    assert len(sqrtPriceX96_to_priceDecimal_array([], 18, 18)) == 0
+    assert len(sqrtPriceX96_to_priceDecimal_array([], 18, 18, exact=True)) == 0
+    assert len(tick_to_priceDecimal_array([], 18, 18)) == 0
@@ -0,0 +1,141 @@
+import json
+import math
+
+import msgpack
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+from v3data import responses
+from v3data.responses import Records, dumps, json_response, ndjson_response, render
+
+
+def stdlib_dumps(obj):
+    """What Flask's jsonify produced before"""
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+def test_records_behave_like_to_dict_records():
+    df = pd.DataFrame({
+        'group': ['USDC-WETH', 'USDC-WETH', 'WBTC-WETH'],
+        'date': ['2021-07-23T00:00:00Z', '2021-07-24T00:00:00Z', '2021-07-24T00:00:00Z'],
+        'value': [1.5, np.nan, 3.0],
+        'count': [1, 2, 3]
+    })
+    records = Records.from_frame(df)
+
+    assert len(records) == 3
+    assert records[1]['date'] == '2021-07-24T00:00:00Z'
+    assert list(records)[2] == {'group': 'WBTC-WETH', 'date': '2021-07-24T00:00:00Z', 'value': 3.0, 'count': 3}
+    assert math.isnan(list(records)[1]['value'])
+
+
+def test_records_serialize_like_stdlib():
+    df = pd.DataFrame({
+        'group': ['a"b', 'c%s', 'a"b', None],
+        'value': [1.5, np.nan, np.inf, -np.inf],
+        'min': [1e-7, 2e16, 0.0, -3.25],
+        'count': [1, 2, 3, 2 ** 40]
+    })
+    records = Records.from_frame(df)
+    payload = {'b': records, 'a': {'nested': records, 'empty': Records({'value': []})}}
+
+    content = dumps(payload).decode()
+
+    assert content.index('"a"') < content.index('"b"')
+    assert 'NaN' in content and '-Infinity' in content
+    assert stdlib_dumps(json.loads(content)) == stdlib_dumps(json.loads(stdlib_dumps({
+        'b': df.to_dict('records'),
+        'a': {'nested': df.to_dict('records'), 'empty': []}
+    })))
+
+
+def test_plain_payloads_fall_back_to_stdlib_where_needed():
+    payload = {'b': float('inf'), 'a': 2 ** 70, 'c': None, 'e': np.float64(0.5), 'd': np.int64(7)}
+    assert dumps(payload) == stdlib_dumps({
+        'b': float('inf'), 'a': 2 ** 70, 'c': None, 'e': 0.5, 'd': 7
+    }).encode()
+    assert dumps({'b': 1, 'a': [1.0, 'x']}) == stdlib_dumps({'b': 1, 'a': [1.0, 'x']}).encode()
+
+
+class NoStdlib:
+    @staticmethod
+    def dumps(*args, **kwargs):
+        raise AssertionError("stdlib encoder used")
+
+
+def test_none_stays_on_orjson(monkeypatch):
+    payload = {'base_token_index': None, 'bands': None, 'status': 'null', 'values': [1.5, None]}
+    monkeypatch.setattr(responses, 'json', NoStdlib)
+
+    assert dumps(payload) == stdlib_dumps(payload).encode()
+    with pytest.raises(AssertionError):
+        dumps({'value': [None, float('nan')]})
+
+
+def test_json_response():
+    response = json_response({'data': Records({'value': np.array([1.0, 2.0])})})
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == {'data': [{'value': 1.0}, {'value': 2.0}]}
+
+
+def chart_payload():
+    return {'data': Records({
+        'group': ['USDC-WETH', 'USDC-WETH'],
+        'value': np.array([1.5, np.nan]),
+        'max': np.array([2.0, 3.0])
+    })}
+
+
+def test_columnar_format():
+    app = Flask(__name__)
+    with app.test_request_context('/?format=columnar'):
+        response = render(chart_payload())
+
+    assert response.get_data() == b'{"data":{"group":["USDC-WETH","USDC-WETH"],"max":[2.0,3.0],"value":[1.5,NaN]}}\n'
+
+
+def test_msgpack_format():
+    app = Flask(__name__)
+    with app.test_request_context('/', headers={'Accept': 'application/msgpack'}):
+        response = render({**chart_payload(), 'totalSupply': 10 ** 24})
+
+    assert response.mimetype == 'application/msgpack'
+    assert 'Accept' in response.vary
+    data = msgpack.unpackb(response.get_data())
+    assert data['data']['group'] == ['USDC-WETH', 'USDC-WETH']
+    np.testing.assert_array_equal(np.frombuffer(data['data']['value'], dtype='<f8'), [1.5, np.nan])
+    assert data['totalSupply'] == 1e24
+
+
+def test_json_by_default():
+    app = Flask(__name__)
+    with app.test_request_context('/', headers={'Accept': '*/*'}):
+        response = render(chart_payload())
+
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data())['data'][0] == {'group': 'USDC-WETH', 'max': 2.0, 'value': 1.5}
+
+
+def test_ndjson_streams_one_line_per_item():
+    produced = []
+
+    def items():
+        for key in ['0x1', '0x2']:
+            produced.append(key)
+            yield key, Records({'value': np.array([1.5, np.nan])})
+
+    app = Flask(__name__)
+    app.add_url_rule('/stream', 'stream', lambda: ndjson_response(items()))
+
+    response = app.test_client().get('/stream')
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+
+    # Only the first line is produced before the body is read
+    lines = iter(response.response)
+    assert produced == ['0x1']
+    assert next(lines) == b'{"0x1":[{"value":1.5},{"value":NaN}]}\n'
+    assert list(json.loads(next(lines))) == ['0x2']
+    assert produced == ['0x1', '0x2']
+    assert list(lines) == []
@@ -0,0 +1,153 @@
+import math
+import time
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+from v3data.hypervisor import HypervisorData, DAY_SECONDS, YEAR_SECONDS
+from v3data.returns import batch_returns, PrefixSum, WindowReturns
+from v3data.utils import timestamp_ago
+from v3data.constants import DAYS_IN_PERIOD
+
+
+def pandas_returns(data, periods=DAYS_IN_PERIOD):
+    """Reference implementation following the original pandas calculation"""
+    if (not data) or (len(data) < 2):
+        return HypervisorData().empty_returns(periods)
+
+    df_rebalances = DataFrame(data, dtype=np.float64)
+    df_rebalances = df_rebalances[df_rebalances.totalAmountUSD > 0]
+    if df_rebalances.empty:
+        return HypervisorData().empty_returns(periods)
+
+    df_rebalances = df_rebalances.sort_values('timestamp', kind='stable')
+    df_rebalances['feeRate'] = df_rebalances.grossFeesUSD / df_rebalances.totalAmountUSD.shift(1)
+    df_rebalances['periodSeconds'] = df_rebalances.timestamp.diff()
+
+    results = {}
+    for period, days in periods.items():
+        timestamp_start = timestamp_ago(timedelta(days=days))
+        df_period = df_rebalances.loc[df_rebalances.timestamp > timestamp_start].copy()
+        if df_period.empty:
+            timestamp_start = df_rebalances.timestamp.max() - DAY_SECONDS
+            df_period = df_rebalances.loc[df_rebalances.timestamp > timestamp_start].copy()
+
+        df_period['totalPeriodSeconds'] = df_period.periodSeconds.cumsum()
+        df_period['cumFeeReturn'] = (1 + df_period.feeRate).cumprod() - 1
+        returns = df_period[['totalPeriodSeconds', 'cumFeeReturn']].tail(1)
+        returns['feeApr'] = returns.cumFeeReturn * (YEAR_SECONDS / returns.totalPeriodSeconds)
+        returns['feeApy'] = (1 + returns.cumFeeReturn * (DAY_SECONDS / returns.totalPeriodSeconds)) ** 365 - 1
+        results[period] = returns.to_dict('records')[0]
+
+    return results
+
+
+def rebalances(rng, n, spacing_hours):
+    now = int(time.time())
+    timestamps = now - np.cumsum(rng.exponential(spacing_hours * 3600, n)).astype(int)
+    return [
+        {
+            "timestamp": str(timestamp),
+            "grossFeesUSD": str(rng.uniform(0, 50)),
+            "protocolFeesUSD": "0",
+            "netFeesUSD": "0",
+            "totalAmountUSD": str(rng.uniform(1e4, 1e6))
+        }
+        for timestamp in timestamps
+    ]
+
+
+@pytest.fixture
+def hypervisors():
+    rng = np.random.default_rng(3)
+    hypervisors = [
+        {"id": f"0x{i:040x}", "rebalances": rebalances(rng, n, spacing)}
+        for i, (n, spacing) in enumerate([(50, 6), (200, 1), (3, 200), (40, 72), (2, 400)])
+    ]
+    # Not enough data
+    hypervisors.append({"id": "0xempty", "rebalances": []})
+    hypervisors.append({"id": "0xsingle", "rebalances": rebalances(rng, 1, 1)})
+    # Only one rebalance left once empty ones are dropped
+    one_left = rebalances(rng, 3, 1)
+    one_left[0]["totalAmountUSD"] = one_left[1]["totalAmountUSD"] = "0"
+    hypervisors.append({"id": "0xoneleft", "rebalances": one_left})
+    no_amount = rebalances(rng, 3, 1)
+    for rebalance in no_amount:
+        rebalance["totalAmountUSD"] = "0"
+    hypervisors.append({"id": "0xnoamount", "rebalances": no_amount})
+    return hypervisors
+
+
+def assert_returns_equal(actual, expected):
+    assert list(actual) == list(expected)
+    for period in expected:
+        assert set(actual[period]) == set(expected[period])
+        for key, value in expected[period].items():
+            if isinstance(value, float) and math.isnan(value):
+                assert math.isnan(actual[period][key])
+            else:
+                assert actual[period][key] == pytest.approx(value, rel=1e-9)
+
+
+def test_batch_matches_pandas(hypervisors):
+    hypervisor_data = HypervisorData()
+    batch = batch_returns(hypervisors)
+
+    for hypervisor, returns in zip(hypervisors, batch):
+        expected = pandas_returns(hypervisor['rebalances'])
+        assert_returns_equal(returns or hypervisor_data.empty_returns(), expected)
+
+
+@pytest.mark.parametrize("periods", [DAYS_IN_PERIOD, {"3d": 3, "14d": 14, "90d": 90}])
+def test_windowed_returns_match_pandas(hypervisors, periods):
+    hypervisor_data = HypervisorData()
+
+    for hypervisor in hypervisors:
+        expected = pandas_returns(hypervisor['rebalances'], periods)
+        assert_returns_equal(hypervisor_data._calculate_returns(hypervisor['rebalances'], periods), expected)
+
+
+@pytest.mark.filterwarnings("error")
+def test_overflowing_apy_without_warnings():
+    now = int(time.time())
+    # Fees as large as the position a minute after the previous rebalance
+    data = [
+        {"timestamp": str(now - 120 + 60 * i), "grossFeesUSD": "1000", "protocolFeesUSD": "0",
+         "netFeesUSD": "0", "totalAmountUSD": "1000"}
+        for i in range(2)
+    ]
+
+    scalar = HypervisorData()._calculate_returns(data)
+    batch = batch_returns([{"id": "0xfast", "rebalances": data}])[0]
+
+    assert batch == scalar
+    assert math.isinf(batch['daily']['feeApy'])
+
+
+def test_all_returns_keyed_by_hypervisor(hypervisors):
+    hypervisor_data = HypervisorData()
+    hypervisor_data.all_rebalance_data = hypervisors
+    all_returns = hypervisor_data._all_returns()
+
+    assert list(all_returns) == [hypervisor['id'] for hypervisor in hypervisors]
+    assert all_returns["0xempty"] == hypervisor_data.empty_returns()
+
+
+def test_window_returns_match_cumprod():
+    rng = np.random.default_rng(5)
+    rates = rng.uniform(0, 0.01, 100)
+    rates[0] = np.nan
+    window_returns = WindowReturns(rates)
+
+    for start, end in [(0, 100), (1, 100), (37, 100), (99, 100), (10, 20)]:
+        expected = np.nanprod(1 + rates[start:end]) - 1
+        assert window_returns.compound(start, end) == pytest.approx(expected, rel=1e-12)
+
+
+def test_prefix_sum_skips_undefined():
+    prefix_sum = PrefixSum([np.nan, 1.0, 2.0, 3.0])
+    assert prefix_sum.sum() == 6.0
+    assert prefix_sum.sum(2) == 5.0
+    assert prefix_sum.sum(1, 3) == 3.0
@@ -0,0 +1,132 @@
+import pickle
+
+import pytest
+from flask import Flask
+from flask_caching import Cache
+
+from v3data import sharedcache
+from v3data.sharedcache import SharedCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def time(self):
+        # Every call is a distinct instant, so access order is well defined
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sharedcache, 'time', clock)
+    return clock
+
+
+def cache_at(tmp_path, **kwargs):
+    return SharedCache(str(tmp_path / "cache.sqlite"), **kwargs)
+
+
+def test_expiry(tmp_path, clock):
+    cache = cache_at(tmp_path, default_timeout=60)
+    cache.set("default", 1)
+    cache.set("short", 2, timeout=10)
+    cache.set("forever", 3, timeout=0)
+
+    clock.now += 30
+    assert cache.get("short") is None
+    assert not cache.has("short")
+    assert cache.get("default") == 1
+
+    clock.now += 3600
+    assert cache.get("default") is None
+    assert cache.get("forever") == 3
+
+
+def test_shared_between_instances(tmp_path, clock):
+    cache_at(tmp_path).set("key", {"data": [1, 2]})
+    assert cache_at(tmp_path).get("key") == {"data": [1, 2]}
+
+
+def test_least_recently_used_evicted_by_entries(tmp_path, clock):
+    cache = cache_at(tmp_path, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # a is now more recently used than b
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_least_recently_used_evicted_by_bytes(tmp_path, clock):
+    value = "x" * 1000
+    size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    cache = cache_at(tmp_path, max_bytes=2 * size + size // 2)
+    cache.set("a", value)
+    cache.set("b", value)
+    cache.get("a")
+    cache.set("c", value)
+
+    assert not cache.has("b")
+    assert cache.has("a") and cache.has("c")
+
+    # Larger than the whole cache, never stored
+    assert cache.set("huge", "x" * 10000) is False
+    assert cache.has("a")
+
+
+def test_add_does_not_overwrite(tmp_path, clock):
+    cache = cache_at(tmp_path)
+    assert cache.add("key", 1, timeout=10)
+    assert not cache.add("key", 2)
+    assert cache.get("key") == 1
+
+    # An expired entry can be replaced
+    clock.now += 20
+    assert cache.add("key", 3)
+    assert cache.get("key") == 3
+
+
+def test_delete_and_clear(tmp_path, clock):
+    cache = cache_at(tmp_path)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.delete("a")
+    assert not cache.delete("a")
+    assert cache.get("a") is None
+
+    assert cache.clear()
+    assert cache.get("b") is None
+
+
+def test_flask_caching_factory(tmp_path):
+    app = Flask(__name__)
+    app.config.from_mapping({
+        'CACHE_TYPE': 'v3data.sharedcache.SharedCache',
+        'CACHE_ARGS': [str(tmp_path / "cache.sqlite")],
+        'CACHE_DEFAULT_TIMEOUT': 120
+    })
+    cache = Cache(app)
+    calls = []
+
+    @app.route('/chart')
+    @cache.cached()
+    def chart():
+        calls.append(1)
+        return {"data": len(calls)}
+
+    client = app.test_client()
+    assert client.get('/chart').get_json() == {"data": 1}
+    assert client.get('/chart').get_json() == {"data": 1}
+    assert len(calls) == 1
+
+    backend = cache.cache
+    assert isinstance(backend, SharedCache)
+    assert backend.path == str(tmp_path / "cache.sqlite")
+    assert backend.default_timeout == 120
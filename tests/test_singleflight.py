@@ -0,0 +1,66 @@
+import threading
+import time
+import pytest
+from v3data import SubgraphClient
+from v3data.singleflight import SingleFlight
+
+
+class SlowClient(SubgraphClient):
+    def __init__(self):
+        super().__init__("http://localhost")
+        self.fetches = 0
+
+    def _fetch(self, params):
+        self.fetches += 1
+        time.sleep(0.1)
+        return b'{"data": {"uniswapV3Hypervisors": [{"id": "0x1"}]}}'
+
+
+def run_threads(target, n):
+    results = [None] * n
+
+    def run(i):
+        results[i] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_identical_queries_share_one_request():
+    client = SlowClient()
+    results = run_threads(lambda: client.query("{ uniswapV3Hypervisors { id } }"), 10)
+
+    assert client.fetches == 1
+    assert all(result == results[0] for result in results)
+    # Each caller gets its own copy of the data
+    assert len({id(result) for result in results}) == 10
+
+
+def test_different_variables_are_not_shared():
+    client = SlowClient()
+    counter = iter(range(10))
+    run_threads(lambda: client.query("query($id: String!){ x }", {"id": str(next(counter))}), 10)
+
+    assert client.fetches == 10
+
+
+def test_errors_are_shared():
+    flight = SingleFlight()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.1)
+        raise RuntimeError("upstream failed")
+
+    def call():
+        with pytest.raises(RuntimeError):
+            flight.do("key", failing)
+        return True
+
+    assert all(run_threads(call, 5))
+    assert len(calls) == 1
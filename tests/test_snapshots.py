@@ -0,0 +1,61 @@
+import threading
+import time
+
+from flask import Flask
+
+from v3data.snapshots import SnapshotRefresher
+
+
+def worker_app(path, calls):
+    """App of one worker process, serving /charts/dailyTvl from snapshots"""
+    app = Flask(__name__)
+    snapshots = SnapshotRefresher(app, path=path)
+
+    @app.route('/charts/dailyTvl')
+    @snapshots.serve('/charts/dailyTvl')
+    def daily_tvl():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"data": [1, 2, 3]}
+
+    return app, snapshots
+
+
+def test_missing_snapshot_computed_once(tmp_path):
+    calls = []
+    path = str(tmp_path / "snapshots.sqlite")
+    workers = [worker_app(path, calls)[0] for _ in range(2)]
+    responses = []
+
+    def get(app):
+        responses.append(app.test_client().get('/charts/dailyTvl'))
+
+    threads = [threading.Thread(target=get, args=(app,)) for app in workers for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [response.status_code for response in responses] == [200] * 6
+    assert all(response.get_json() == {"data": [1, 2, 3]} for response in responses)
+
+
+def test_snapshot_served_after_publish(tmp_path):
+    calls = []
+    app, snapshots = worker_app(str(tmp_path / "snapshots.sqlite"), calls)
+    client = app.test_client()
+
+    assert client.get('/charts/dailyTvl').headers['X-Snapshot-Age'] == '0'
+    assert client.get('/charts/dailyTvl').get_json() == {"data": [1, 2, 3]}
+    assert len(calls) == 1
+    assert snapshots.get('/charts/dailyTvl') is not None
+
+
+def test_snapshot_responses_vary_on_accept(tmp_path):
+    app, _ = worker_app(str(tmp_path / "snapshots.sqlite"), [])
+    client = app.test_client()
+
+    # Computed, then served from the snapshot
+    for _ in range(2):
+        assert 'Accept' in client.get('/charts/dailyTvl').vary
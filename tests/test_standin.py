@@ -0,0 +1,87 @@
+import pytest
+
+import v3data
+from v3data import SubgraphClient
+from v3data.recording import Recorder, read_recordings
+from v3data.standin import create_app
+
+URL = "https://api.thegraph.com/subgraphs/name/visorfinance/visor"
+
+QUERY = """
+query swaps($paginate: String!){
+    swaps(first: 2, orderBy: id, orderDirection: asc, where: {id_gt: $paginate}){
+        id
+        timestamp
+    }
+}
+"""
+
+SWAPS = [{"id": f"0x{i:02x}", "timestamp": str(1000 + i)} for i in range(5)]
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+
+def subgraph(url, json):
+    """Paginated swaps the way the subgraph serves them"""
+    swaps = [swap for swap in SWAPS if swap['id'] > json['variables']['paginate']]
+    return Response(v3data.json.dumps({"data": {"swaps": swaps[:2]}}).encode())
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    path = str(tmp_path / "recordings.jsonl")
+    monkeypatch.setattr(v3data, '_recorder', Recorder(path))
+    monkeypatch.setattr(v3data.session, 'post', subgraph)
+
+    assert SubgraphClient(URL).paginate_query(QUERY, "id", {"paginate": ""}) == SWAPS
+    monkeypatch.setattr(v3data, '_recorder', None)
+
+    return list(read_recordings(path))
+
+
+def replay(monkeypatch, app):
+    client = app.test_client()
+
+    def post(url, json):
+        path = url.split('localhost:8000', 1)[1]
+        return Response(client.post(path, json=json).data)
+
+    monkeypatch.setattr(v3data.session, 'post', post)
+
+
+def test_requests_recorded(recordings):
+    assert len(recordings) == 4
+    assert recordings[0]['url'] == URL
+    assert recordings[0]['query'] == ' '.join(QUERY.split())
+    assert recordings[1]['variables']['paginate'] == "0x01"
+    assert recordings[1]['response'] == {"data": {"swaps": SWAPS[2:4]}}
+
+
+def test_replay_recorded_pages(recordings, monkeypatch):
+    replay(monkeypatch, create_app(recordings))
+    client = SubgraphClient("http://localhost:8000/subgraphs/name/visorfinance/visor")
+
+    assert client.paginate_query(QUERY, "id", {"paginate": ""}) == SWAPS
+
+
+def test_pagination_emulated_over_recorded_entities(recordings, monkeypatch):
+    replay(monkeypatch, create_app(recordings))
+    client = SubgraphClient("http://localhost:8000/subgraphs/name/visorfinance/visor")
+
+    # Cursor never recorded
+    assert client.query(QUERY, {"paginate": "0x00"})['data']['swaps'] == SWAPS[1:3]
+    assert 'errors' in client.query("{ pools { id } }")
+
+
+def test_non_json_response_not_recorded(tmp_path):
+    path = str(tmp_path / "recordings.jsonl")
+    recorder = Recorder(path)
+
+    recorder.record(URL, {'query': QUERY}, b'<html><body>502 Bad Gateway</body></html>')
+    recorder.record(URL, {'query': QUERY}, b'{"data": {"swa')
+    recorder.record(URL, {'query': QUERY}, b'{"data": {"swaps": []}}')
+
+    assert [recording['response'] for recording in read_recordings(path)] == [{"data": {"swaps": []}}]
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from v3data.swapstore import SwapStore
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class Subgraph:
+    """Daily swaps of one pool in pages, recording the ranges asked for"""
+
+    def __init__(self, days):
+        now = int(time.time())
+        self.swaps = [
+            {"id": str(day), "timestamp": str(now - day * DAY_SECONDS), "sqrtPriceX96": str(2 ** 96)}
+            for day in range(days)
+        ]
+        self.fetched = []
+
+    def __call__(self, pool_address, start, end, page_size=10):
+        self.fetched.append((start, end))
+        swaps = sorted(
+            (swap for swap in self.swaps if start <= int(swap['timestamp']) < end),
+            key=lambda swap: int(swap['timestamp'])
+        )
+        for page_start in range(0, len(swaps), page_size):
+            yield swaps[page_start:page_start + page_size]
+
+
+def window(store, pool_address, timestamp_start, subgraph):
+    return [row for rows in store.iter_window(pool_address, timestamp_start, subgraph) for row in rows]
+
+
+def test_window_longer_than_retention(tmp_path):
+    store = SwapStore(str(tmp_path / "swaps.sqlite"), retention_days=60)
+    subgraph = Subgraph(100)
+    timestamp_start = int(time.time()) - 77 * DAY_SECONDS - 60
+
+    assert len(window(store, "pool", timestamp_start, subgraph)) == 78
+
+    # Only the new swaps are fetched, the start of the window is kept
+    subgraph.fetched.clear()
+    assert len(window(store, "pool", timestamp_start + 1, subgraph)) == 78
+    assert len(subgraph.fetched) == 1
+    assert subgraph.fetched[0][0] >= int(subgraph.swaps[0]['timestamp'])
+
+
+def test_pruned_beyond_retention(tmp_path):
+    store = SwapStore(str(tmp_path / "swaps.sqlite"), retention_days=10)
+    subgraph = Subgraph(30)
+
+    assert len(window(store, "pool", int(time.time()) - 5 * DAY_SECONDS - 60, subgraph)) == 6
+
+    connection = store._connect()
+    count = connection.execute("SELECT count(*) FROM swaps").fetchone()[0]
+    connection.close()
+    assert count == 6
+
+
+def test_pages_stored_as_they_arrive(tmp_path):
+    store = SwapStore(str(tmp_path / "swaps.sqlite"))
+    subgraph = Subgraph(30)
+    timestamp_start = int(time.time()) - 29 * DAY_SECONDS - 60
+
+    def failing(pool_address, start, end):
+        pages = subgraph(pool_address, start, end)
+        yield next(pages)
+        raise ConnectionError("subgraph down")
+
+    with pytest.raises(ConnectionError):
+        window(store, "pool", timestamp_start, failing)
+
+    # The first page is kept and the next sync resumes after it
+    subgraph.fetched.clear()
+    assert len(window(store, "pool", timestamp_start, subgraph)) == 30
+    assert subgraph.fetched[0][0] == int(subgraph.swaps[20]['timestamp'])
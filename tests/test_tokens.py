@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from v3data import tokens
+from v3data.tokens import TokenIndex, TokenRegistry
+
+TOKENS = [
+    {"symbol": "USDC", "address": "0xa0b8"},
+    {"symbol": "USDT", "address": "0xdac1"},
+    {"symbol": "cDAI", "address": "0x5d3a"},
+    {"symbol": "VISR", "address": "0xf938"},
+    {"symbol": "visr", "address": "0x0001"}
+]
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeSource:
+    def __init__(self):
+        self.requests = []
+        self.down = False
+
+    def get(self, url, headers=None):
+        self.requests.append(headers)
+        if self.down:
+            raise ConnectionError("unreachable")
+        if headers and headers.get('If-None-Match') == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, json.dumps({"tokens": TOKENS}).encode(), {"ETag": '"v1"'})
+
+
+@pytest.fixture
+def source(monkeypatch):
+    source = FakeSource()
+    monkeypatch.setattr(tokens.session, 'get', source.get)
+    return source
+
+
+def test_index_lookups():
+    index = TokenIndex(TOKENS)
+
+    assert index.addresses("USDC") == ["0xa0b8"]
+    assert index.addresses("usdc") == ["0xa0b8"]
+    assert index.addresses("cDAI") == ["0x5d3a"]
+    assert index.addresses("CDAI") == ["0x5d3a"]
+    assert index.addresses("visr") == ["0x0001"]
+    assert index.addresses("Visr") == ["0xf938", "0x0001"]
+    assert index.addresses("WETH") == []
+
+    assert index.search("us") == {"USDC": ["0xa0b8"], "USDT": ["0xdac1"]}
+    assert index.search("us", limit=1) == {"USDC": ["0xa0b8"]}
+    assert index.search("x") == {}
+
+
+def test_list_downloaded_once_and_revalidated(tmp_path, source):
+    registry = TokenRegistry(url="http://tokens", path=str(tmp_path / "tokens.json"), refresh_interval=60)
+
+    assert registry.addresses("usdc") == ["0xa0b8"]
+    assert registry.addresses("usdt") == ["0xdac1"]
+    assert source.requests == [{}]
+
+    # Stale copy is revalidated with its ETag
+    registry.refresh_interval = 0
+    assert registry.refresh()
+    assert source.requests[-1] == {"If-None-Match": '"v1"'}
+    assert len(source.requests) == 2
+
+
+def test_disk_copy_shared_and_used_offline(tmp_path, source):
+    path = str(tmp_path / "tokens.json")
+    TokenRegistry(url="http://tokens", path=path, refresh_interval=60).index()
+
+    # Fresh copy on disk, no download
+    assert TokenRegistry(url="http://tokens", path=path, refresh_interval=60).addresses("VISR") == ["0xf938"]
+    assert len(source.requests) == 1
+
+    # Stale copy and source down, the copy is still served
+    source.down = True
+    registry = TokenRegistry(url="http://tokens", path=path, refresh_interval=0)
+    assert not registry.refresh()
+    assert registry.addresses("VISR") == ["0xf938"]
+
+    # Nothing on disk and source down
+    with pytest.raises(RuntimeError):
+        TokenRegistry(url="http://tokens", path=str(tmp_path / "missing.json")).index()
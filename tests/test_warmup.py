@@ -0,0 +1,99 @@
+import threading
+import time
+
+from flask import Flask, request
+
+import app as app_module
+import gunicorn_config
+from v3data.warmup import Warmup
+
+
+def counting_app(hits):
+    app = Flask(__name__)
+
+    @app.route('/charts/dailyTvl')
+    def daily_tvl():
+        hits.append(request.full_path)
+        # Slow enough for the other workers to find the lock taken
+        time.sleep(0.05)
+        return {"data": []}
+
+    @app.route('/broken')
+    def broken():
+        hits.append(request.full_path)
+        raise ValueError("subgraph down")
+
+    return app
+
+
+def test_routes_requested_once_per_host(tmp_path, monkeypatch):
+    hits = []
+    routes = ['/charts/dailyTvl', '/charts/dailyTvl?days=30']
+    marker_path = str(tmp_path / 'warmup.json')
+    # One per worker process
+    workers = [Warmup(counting_app(hits), routes, marker_path, poll_interval=0.01) for _ in range(3)]
+
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(hits) == ['/charts/dailyTvl?', '/charts/dailyTvl?days=30']
+    assert all(worker.ready.is_set() for worker in workers)
+    assert all(worker.marker == workers[0].marker for worker in workers)
+    assert workers[0].marker['routes']['/charts/dailyTvl?days=30']['status'] == 200
+
+    # Restarted server warms up again
+    monkeypatch.setenv('METRICS_DIR', str(tmp_path / 'metrics'))
+    monkeypatch.setenv('SNAPSHOT_PATH', str(tmp_path / 'snapshots.sqlite'))
+    monkeypatch.setenv('WARMUP_MARKER_PATH', marker_path)
+    gunicorn_config.on_starting(None)
+    Warmup(counting_app(hits), routes, marker_path).run()
+    assert len(hits) == 4
+
+
+def test_failing_route_still_ready(tmp_path):
+    hits = []
+    warmup = Warmup(counting_app(hits), ['/broken', '/charts/dailyTvl'], str(tmp_path / 'warmup.json'))
+    warmup.run()
+
+    assert warmup.ready.is_set()
+    assert warmup.marker['routes']['/broken']['status'] == 500
+    assert warmup.marker['routes']['/charts/dailyTvl']['status'] == 200
+
+
+class Snapshots:
+    """Stands in for the snapshot refresher started after the warm-up"""
+    started = False
+
+    def start(self):
+        self.started = True
+
+
+def test_ready_endpoint(tmp_path, monkeypatch):
+    release = threading.Event()
+    slow_app = Flask(__name__)
+
+    @slow_app.route('/slow')
+    def slow():
+        release.wait(5)
+        return {"data": []}
+
+    warmup = Warmup(slow_app, ['/slow'], str(tmp_path / 'warmup.json'))
+    snapshots = Snapshots()
+    monkeypatch.setattr(app_module, 'warmup', warmup)
+    monkeypatch.setattr(app_module, 'snapshots', snapshots)
+    client = app_module.app.test_client()
+
+    # Not started by gunicorn, the first check starts warming up
+    response = client.get('/status/ready')
+    assert response.status_code == 503
+    assert response.get_json()['ready'] is False
+
+    release.set()
+    warmup._thread.join()
+    assert snapshots.started
+    response = client.get('/status/ready')
+    assert response.status_code == 200
+    assert response.get_json()['warmup']['routes']['/slow']['status'] == 200
@@ -1,17 +1,111 @@
-import requests
+import json
+import logging
+import math
+import time
+from functools import partial
+from urllib.parse import urlparse
 
+from v3data import session
+from v3data.singleflight import SingleFlight
+from v3data.blockcache import BlockTracker, BlockQueryCache, subgraph_name
+from v3data.blocks import BlockIndex
+from v3data.recording import Recorder
+from v3data.metrics import registry, query_fingerprint, add_stage_time
+from v3data.memo import memoized, count_upstream_call
+from v3data.process import after_fork
 from v3data.config import (
     VISOR_SUBGRAPH_URL,
     UNI_V2_SUBGRAPH_URL,
     UNI_V3_SUBGRAPH_URL,
     ETH_BLOCKS_SUBGRAPH_URL,
-    THEGRAPH_INDEX_NODE_URL
+    THEGRAPH_INDEX_NODE_URL,
+    PAGINATE_MAX_PARTITIONS,
+    CACHE_MODE,
+    BLOCK_POLL_INTERVAL,
+    BLOCK_QUERY_CACHE_SIZE,
+    BLOCK_INDEX_SEGMENT_SIZE,
+    BLOCK_INDEX_MAX_SEGMENTS,
+    SUBGRAPH_RECORD_PATH
 )
 
+PAGE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+# Identical requests in flight at the same time share one upstream call
+_inflight = SingleFlight()
+after_fork(_inflight.reset_after_fork)
+
+
+# Query results keyed by the latest indexed block when CACHE_MODE is 'block'
+_block_query_cache = BlockQueryCache(BLOCK_QUERY_CACHE_SIZE)
+after_fork(_block_query_cache.reset_after_fork)
+
+# Upstream requests and responses are recorded for replay when SUBGRAPH_RECORD_PATH is set
+_recorder = Recorder(SUBGRAPH_RECORD_PATH) if SUBGRAPH_RECORD_PATH else None
+if _recorder is not None:
+    after_fork(_recorder.reset_after_fork)
+
 
 class SubgraphClient:
+    # Whether results can be cached by the latest indexed block of the subgraph
+    block_cached = True
+
     def __init__(self, url):
         self._url = url
+        self._subgraph = subgraph_name(url) or urlparse(url).path
+
+    def _fetch(self, params):
+        """Send request through the shared keep-alive pool"""
+        fingerprint = query_fingerprint(params['query'])
+        with registry.timer('subgraph_request_seconds', subgraph=self._subgraph, query=fingerprint):
+            response = session.post(self._url, json=params)
+        count_upstream_call(self._subgraph)
+        registry.observe('subgraph_response_bytes', len(response.content), subgraph=self._subgraph, query=fingerprint)
+        if _recorder is not None:
+            _recorder.record(self._url, params, response.content)
+        return response.content
+
+    def _post(self, params):
+        """Send request, timed per query and towards the subgraph stage of the request"""
+        fingerprint = query_fingerprint(params['query'])
+        start = time.perf_counter()
+        try:
+            data = self._shared_post(params)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.observe('subgraph_query_seconds', elapsed, subgraph=self._subgraph, query=fingerprint)
+            add_stage_time('subgraph', elapsed)
+
+        if 'errors' in data:
+            registry.inc('subgraph_errors_total', subgraph=self._subgraph, query=fingerprint)
+
+        return data
+
+    def _shared_post(self, params):
+        """Send request, sharing the response with identical concurrent requests
+
+        Identical requests within one request being served share a response
+        too. The raw response is shared and parsed per caller, so callers are
+        free to mutate the data they get back.
+        """
+        key = (self._url, json.dumps(params, sort_keys=True))
+
+        block = None
+        if CACHE_MODE == 'block' and self.block_cached:
+            block = block_tracker.latest_block(self._url)
+            if block is not None:
+                content = _block_query_cache.get((key, block))
+                if content is not None:
+                    return json.loads(content)
+
+        content = memoized(('query', key), partial(_inflight.do, key, partial(self._fetch, params)))
+        data = json.loads(content)
+
+        if block is not None and 'errors' not in data:
+            _block_query_cache.set((key, block), content)
+
+        return data
 
     def query(self, query: str, variables=None) -> dict:
         """Make graphql query to subgraph"""
@@ -19,33 +113,154 @@ class SubgraphClient:
             params = {'query': query, 'variables': variables}
         else:
             params = {'query': query}
-        response = requests.post(self._url, json=params)
-        return response.json()
-
-    def paginate_query(self, query, paginate_variable, variables={}):
-
-        # if not variables:
-        #     variables = {}
+        return self._post(params)
 
+    def pagination_params(self, query, paginate_variable, variables=None):
+        """Request params for the first page of paginate_query"""
         if f"{paginate_variable}_gt" not in query:
             raise ValueError("Paginate variable missing in query")
 
+        variables = dict(variables or {})
         variables['orderBy'] = paginate_variable
         variables['orderDirection'] = "asc"
 
+        return {'query': query, 'variables': variables}
+
+    def next_page(self, params, paginate_variable, response):
+        """Page of entities in response, moving params on to the following page
+
+        Shared by the synchronous and the asyncio pagination, which only
+        differ in how response is requested. An empty page is the last.
+        """
+        data = next(iter(response['data'].values()))
+        registry.inc('subgraph_pages_total', subgraph=self._subgraph, query=query_fingerprint(params['query']))
+        if data:
+            params['variables']['paginate'] = data[-1][paginate_variable]
+        return data
+
+    def iter_pages(self, query, paginate_variable, variables={}):
+        """Yield pages of paginate_query as they arrive"""
+        params = self.pagination_params(query, paginate_variable, variables)
+        while True:
+            data = self.next_page(params, paginate_variable, self._post(params))
+            if not data:
+                return
+            yield data
+
+    def paginate_query(self, query, paginate_variable, variables={}):
+
+        # if not variables:
+        #     variables = {}
+
         all_data = []
-        has_data = True
-        params = {'query': query, 'variables': variables}
-        while has_data:
-            response = requests.post(self._url, json=params)
-            data = next(iter(response.json()['data'].values()))
-            has_data = bool(data)
-            if has_data:
+        with registry.timer('subgraph_paginated_seconds', subgraph=self._subgraph, query=query_fingerprint(query)):
+            for data in self.iter_pages(query, paginate_variable, variables):
                 all_data += data
-                params['variables']['paginate'] = data[-1][paginate_variable]
 
         return all_data
 
+    def iter_range_pages(self, query, range_variable, range_start, range_end, variables=None):
+        """Yield pages of entities with range_start <= range_variable < range_end
+
+        Same query requirements as paginate_range_query, walked one page at
+        a time so callers can fold pages in without holding the whole range.
+        """
+        if f"{range_variable}_gte" not in query or f"{range_variable}_lt" not in query:
+            raise ValueError("Range variable missing in query")
+
+        variables = dict(variables or {})
+        # Pages overlap on the last value of the previous page
+        seen = set()
+        cursor = int(range_start)
+        while True:
+            params = {**variables, 'rangeStart': cursor, 'rangeEnd': int(range_end)}
+            page = next(iter(self.query(query, params)['data'].values()))
+            registry.inc('subgraph_pages_total', subgraph=self._subgraph, query=query_fingerprint(query))
+
+            fresh = [entity for entity in page if entity['id'] not in seen]
+            if fresh:
+                yield fresh
+
+            if len(page) < PAGE_SIZE:
+                return
+
+            next_cursor = int(page[-1][range_variable])
+            if next_cursor == cursor:
+                logger.warning(f"More than {PAGE_SIZE} entities with {range_variable} {cursor}, skipping ahead")
+                next_cursor += 1
+            seen = {entity['id'] for entity in page if int(entity[range_variable]) == next_cursor}
+            cursor = next_cursor
+
+    def _paginate_range(self, query, range_variable, range_start, range_end, variables):
+        """Walk [range_start, range_end) one page at a time"""
+        all_data = []
+        for page in self.iter_range_pages(query, range_variable, range_start, range_end, variables):
+            all_data += page
+
+        return all_data
+
+    def paginate_range_query(self, query, range_variable, range_start, range_end, variables=None, partitions=None):
+        """Fetch all entities with range_start <= range_variable < range_end
+
+        The query must filter on {range_variable}_gte: $rangeStart and
+        {range_variable}_lt: $rangeEnd, ordered by range_variable ascending.
+        Unless partitions is given, the first page is used to estimate how
+        many pages remain and the rest of the range is split into that many
+        sub-ranges (up to PAGINATE_MAX_PARTITIONS) fetched concurrently.
+        Results are ordered by (range_variable, id) whatever the partitioning.
+        """
+        with registry.timer('subgraph_paginated_seconds', subgraph=self._subgraph, query=query_fingerprint(query)):
+            return self._paginate_range_query(query, range_variable, range_start, range_end, variables, partitions)
+
+    def _paginate_range_query(self, query, range_variable, range_start, range_end, variables, partitions):
+        if f"{range_variable}_gte" not in query or f"{range_variable}_lt" not in query:
+            raise ValueError("Range variable missing in query")
+
+        variables = dict(variables or {})
+        range_start = int(range_start)
+        range_end = int(range_end)
+
+        if partitions is None:
+            params = {**variables, 'rangeStart': range_start, 'rangeEnd': range_end}
+            first_page = next(iter(self.query(query, params)['data'].values()))
+            registry.inc('subgraph_pages_total', subgraph=self._subgraph, query=query_fingerprint(query))
+
+            if len(first_page) < PAGE_SIZE:
+                all_data = first_page
+                partitions = 0
+            else:
+                # The last timestamp of the page may continue on the next page
+                page_end = int(first_page[-1][range_variable])
+                all_data = [entity for entity in first_page if int(entity[range_variable]) < page_end]
+                density = len(first_page) / max(page_end - range_start, 1)
+                remaining_pages = density * (range_end - page_end) / PAGE_SIZE
+                partitions = min(max(math.ceil(remaining_pages), 1), PAGINATE_MAX_PARTITIONS)
+                range_start = page_end
+        else:
+            all_data = []
+
+        if range_start >= range_end:
+            partitions = 0
+
+        if partitions == 1:
+            all_data += self._paginate_range(query, range_variable, range_start, range_end, variables)
+        elif partitions > 1:
+            from v3data.aio import run_concurrently
+
+            step = math.ceil((range_end - range_start) / partitions)
+            bounds = [
+                (start, min(start + step, range_end))
+                for start in range(range_start, range_end, step)
+            ]
+            sub_ranges = run_concurrently(*[
+                partial(self._paginate_range, query, range_variable, start, end, variables)
+                for start, end in bounds
+            ], limit=len(bounds))
+            for data in sub_ranges:
+                all_data += data
+
+        return sorted(all_data, key=lambda entity: (int(entity[range_variable]), entity['id']))
+
 
 class VisorClient(SubgraphClient):
     def __init__(self):
@@ -100,8 +315,8 @@ class EthBlocksClient(SubgraphClient):
     def __init__(self):
         super().__init__(ETH_BLOCKS_SUBGRAPH_URL)
 
-    def block_from_timestamp(self, timestamp):
-        """Get closest from timestamp"""
+    def first_block_after(self, timestamp):
+        """Number and timestamp of the first block after timestamp"""
         ten_minutes_in_seconds = 600
         query = """
         query blockQuery($startTime: Int!, $endTime:Int!){
@@ -119,9 +334,33 @@ class EthBlocksClient(SubgraphClient):
             "endTime": timestamp + ten_minutes_in_seconds
         }
 
-        return int(self.query(query, variables)['data']['blocks'][0]['number'])
+        block = self.query(query, variables)['data']['blocks'][0]
+        return int(block['number']), int(block['timestamp'])
+
+    def blocks_between(self, start, end):
+        """Number and timestamp of blocks start to end - 1"""
+        query = """
+        query blockRange($start: BigInt!, $end: BigInt!){
+          blocks(first: 1000, orderBy: number, orderDirection: asc,
+                 where: {number_gte: $start, number_lt: $end}) {
+            number
+            timestamp
+          }
+        }
+        """
+        variables = {"start": str(start), "end": str(end)}
+        blocks = self.query(query, variables)['data']['blocks']
+        return [(int(block['number']), int(block['timestamp'])) for block in blocks]
+
+    def block_from_timestamp(self, timestamp):
+        """Get closest from timestamp"""
+        return block_index.block_after(timestamp)
+
 
 class IndexNodeClient(SubgraphClient):
+    # Index node status is what block keyed caching is based on
+    block_cached = False
+
     def __init__(self):
         super().__init__(THEGRAPH_INDEX_NODE_URL)
         self.set_subgraph_name()
@@ -133,11 +372,12 @@ class IndexNodeClient(SubgraphClient):
         self.subgraph_name = f"{split_visor_url[-2]}/{split_visor_url[-1]}"
 
 
-    def status(self):
+    def latest_block(self, subgraph_name=None):
+        """Latest block indexed by subgraph, the Visor subgraph by default"""
         query = f"""
         {{ 
             indexingStatusForCurrentVersion(
-                subgraphName: "{self.subgraph_name}"
+                subgraphName: "{subgraph_name or self.subgraph_name}"
             ){{
                 chains{{
                     latestBlock {{ hash number }}
@@ -145,9 +385,24 @@ class IndexNodeClient(SubgraphClient):
             }}
         }}
         """
-        latestBlock = int(self.query(query)['data']['indexingStatusForCurrentVersion']['chains'][0]['latestBlock']['number'])
+        return int(self.query(query)['data']['indexingStatusForCurrentVersion']['chains'][0]['latestBlock']['number'])
 
+    def status(self):
         return {
             "url": VISOR_SUBGRAPH_URL,
-            "latestBlock": latestBlock
+            "latestBlock": self.latest_block()
         }
+
+
+block_index = BlockIndex(
+    lambda start, end: EthBlocksClient().blocks_between(start, end),
+    lambda timestamp: EthBlocksClient().first_block_after(timestamp),
+    segment_size=BLOCK_INDEX_SEGMENT_SIZE,
+    max_segments=BLOCK_INDEX_MAX_SEGMENTS
+)
+after_fork(block_index.reset_after_fork)
+
+block_tracker = BlockTracker(
+    lambda subgraph_name: IndexNodeClient().latest_block(subgraph_name),
+    BLOCK_POLL_INTERVAL
+)
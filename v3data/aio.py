@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from v3data import SubgraphClient
+from v3data.config import ASYNC_CONCURRENCY_LIMIT
+
+
+class AsyncSubgraphClient:
+    """asyncio counterpart of SubgraphClient
+
+    Wraps a SubgraphClient (or a subgraph url) so that requests go through
+    the same keep-alive transport as the synchronous clients. Blocking
+    requests run on the event loop's executor. For callers that own an
+    event loop, synchronous code fans out with run_concurrently instead.
+    """
+    def __init__(self, client):
+        if isinstance(client, str):
+            client = SubgraphClient(client)
+        self._client = client
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, in_context(fn, *args))
+
+    async def query(self, query: str, variables=None) -> dict:
+        """Make graphql query to subgraph"""
+        return await self._run(self._client.query, query, variables)
+
+    async def paginate_query(self, query, paginate_variable, variables=None):
+        params = self._client.pagination_params(query, paginate_variable, variables)
+
+        all_data = []
+        while True:
+            response = await self._run(self._client.query, params['query'], params['variables'])
+            data = self._client.next_page(params, paginate_variable, response)
+            if not data:
+                return all_data
+            all_data += data
+
+
+def in_context(fn, *args):
+    """fn bound to the current context, executor threads do not inherit it
+
+    Keeps per request state such as stage timings visible to requests
+    made on the executor.
+    """
+    return partial(contextvars.copy_context().run, fn, *args)
+
+
+async def gather(*aws, limit=ASYNC_CONCURRENCY_LIMIT):
+    """Await coroutines concurrently with at most limit in flight, results in order"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*[bounded(aw) for aw in aws])
+
+
+def run_concurrently(*functions, limit=ASYNC_CONCURRENCY_LIMIT):
+    """Run blocking functions that each make subgraph requests concurrently, results in order
+
+    Runs on a thread pool rather than an event loop: under gevent every
+    request shares one OS thread, where a second loop could not run while
+    another request's is. Under gevent the pool threads are greenlets.
+    Each call gets its own pool so nested or simultaneous fan-outs never
+    wait on each other's workers.
+    """
+    functions = [in_context(function) for function in functions]
+    with ThreadPoolExecutor(max_workers=max(min(limit, len(functions)), 1), thread_name_prefix='subgraph') as executor:
+        return list(executor.map(lambda function: function(), functions))
+
+
+def gather_queries(requests, limit=ASYNC_CONCURRENCY_LIMIT):
+    """Run list of (client, query, variables) concurrently, results in order"""
+    functions = []
+    for client, query, variables in requests:
+        if isinstance(client, str):
+            client = SubgraphClient(client)
+        functions.append(partial(client.query, query, variables))
+    return run_concurrently(*functions, limit=limit)
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def subgraph_name(url):
+    """Hosted service subgraph name (e.g. visorfinance/visor) from its url"""
+    split_url = url.rstrip('/').split('/')
+    if len(split_url) < 3 or split_url[-3] != 'name':
+        return None
+    return f"{split_url[-2]}/{split_url[-1]}"
+
+
+class BlockTracker:
+    """Latest indexed block per subgraph, polled at most once per interval
+
+    fetch_block(subgraph_name) asks the index node for the latest block.
+    If a poll fails the last known block is kept, so cache keys stay stable
+    instead of every request missing while the index node is unreachable.
+    """
+
+    def __init__(self, fetch_block, poll_interval):
+        self.fetch_block = fetch_block
+        self.poll_interval = poll_interval
+        self._blocks = {}
+
+    def latest_block(self, url):
+        name = subgraph_name(url)
+        if name is None:
+            return None
+
+        block, checked = self._blocks.get(name, (None, 0))
+        if time.monotonic() - checked < self.poll_interval:
+            return block
+
+        try:
+            block = self.fetch_block(name)
+        except Exception:
+            logger.exception(f"Failed to get latest block for {name}")
+        self._blocks[name] = (block, time.monotonic())
+
+        return block
+
+
+class BlockQueryCache:
+    """Raw subgraph responses keyed by the block they were served at
+
+    Entries for older blocks are never hit again once the subgraph moves
+    on, they just age out of the LRU.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+    def set(self, key, content):
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
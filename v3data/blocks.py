@@ -0,0 +1,148 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+# Seconds between blocks assumed when extrapolating beyond known blocks
+AVERAGE_BLOCK_TIME = 13
+
+# Dense segments fetched before falling back to a direct query
+MAX_SEGMENT_FETCHES = 3
+
+
+class BlockSegment:
+    """Timestamps of a run of consecutive blocks"""
+
+    def __init__(self, first_number, timestamps):
+        self.first_number = first_number
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+
+    @property
+    def last_number(self):
+        return self.first_number + len(self.timestamps) - 1
+
+    def block_after(self, timestamp):
+        """First block with a later timestamp, None if not in the segment
+
+        The block before it must be in the segment too, otherwise an
+        earlier block outside the segment could be later than timestamp.
+        """
+        i = int(np.searchsorted(self.timestamps, timestamp, side='right'))
+        if i == 0 or i == len(self.timestamps):
+            return None
+        return self.first_number + i
+
+
+class BlockIndex:
+    """Block number from timestamp without a subgraph query per lookup
+
+    Sparse checkpoints (number, timestamp) collected from every fetch give
+    an interpolated estimate of the block for a timestamp. The dense
+    segment of segment_size blocks around the estimate is fetched once and
+    kept (up to max_segments, least recently used are dropped), lookups
+    within it are a binary search. Only when the estimate keeps missing
+    is fetch_after used for a single block.
+
+    fetch_range(start, end) returns (number, timestamp) of blocks start to
+    end - 1 in order, fetch_after(timestamp) the (number, timestamp) of the
+    first block after timestamp.
+    """
+
+    def __init__(self, fetch_range, fetch_after, segment_size=1000, max_segments=64):
+        self.fetch_range = fetch_range
+        self.fetch_after = fetch_after
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._checkpoint_timestamps = []
+        self._checkpoint_numbers = []
+        self._segments = OrderedDict()
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def add_checkpoint(self, number, timestamp):
+        with self._lock:
+            i = bisect.bisect_left(self._checkpoint_timestamps, timestamp)
+            if i < len(self._checkpoint_timestamps) and self._checkpoint_timestamps[i] == timestamp:
+                return
+            self._checkpoint_timestamps.insert(i, timestamp)
+            self._checkpoint_numbers.insert(i, number)
+
+    def add_segment(self, segment):
+        with self._lock:
+            self._segments[segment.first_number] = segment
+            self._segments.move_to_end(segment.first_number)
+            while len(self._segments) > self.max_segments:
+                self._segments.popitem(last=False)
+        self.add_checkpoint(segment.first_number, int(segment.timestamps[0]))
+        self.add_checkpoint(segment.last_number, int(segment.timestamps[-1]))
+
+    def _cached(self, timestamp):
+        with self._lock:
+            for first_number, segment in self._segments.items():
+                if segment.timestamps[0] <= timestamp < segment.timestamps[-1]:
+                    self._segments.move_to_end(first_number)
+                    return segment.block_after(timestamp)
+        return None
+
+    def estimate(self, timestamp):
+        """Block number interpolated between the checkpoints around timestamp"""
+        with self._lock:
+            timestamps, numbers = self._checkpoint_timestamps, self._checkpoint_numbers
+            if not timestamps:
+                return None
+
+            i = bisect.bisect_right(timestamps, timestamp)
+            if i == 0:
+                return numbers[0] - (timestamps[0] - timestamp) // AVERAGE_BLOCK_TIME
+            if i == len(timestamps):
+                return numbers[-1] + (timestamp - timestamps[-1]) // AVERAGE_BLOCK_TIME + 1
+
+            t0, t1 = timestamps[i - 1], timestamps[i]
+            n0, n1 = numbers[i - 1], numbers[i]
+            return n0 + 1 + (timestamp - t0) * (n1 - n0 - 1) // (t1 - t0)
+
+    def _fetch_segment(self, estimate):
+        start = max(estimate - self.segment_size // 2, 0)
+        blocks = self.fetch_range(start, start + self.segment_size)
+        if not blocks:
+            return None
+
+        numbers = [number for number, _ in blocks]
+        # Only runs of consecutive blocks can answer lookups
+        if numbers[-1] - numbers[0] != len(numbers) - 1:
+            for number, timestamp in (blocks[0], blocks[-1]):
+                self.add_checkpoint(number, timestamp)
+            return None
+
+        segment = BlockSegment(numbers[0], [timestamp for _, timestamp in blocks])
+        self.add_segment(segment)
+        return segment
+
+    def block_after(self, timestamp):
+        """Number of the first block with a timestamp after timestamp"""
+        timestamp = int(timestamp)
+
+        number = self._cached(timestamp)
+        if number is not None:
+            return number
+
+        for _ in range(MAX_SEGMENT_FETCHES):
+            estimate = self.estimate(timestamp)
+            if estimate is None:
+                break
+            segment = self._fetch_segment(estimate)
+            if segment is None:
+                break
+            number = segment.block_after(timestamp)
+            if number is not None:
+                return number
+
+        number, block_timestamp = self.fetch_after(timestamp)
+        self.add_checkpoint(number, block_timestamp)
+        return number
@@ -1,7 +1,20 @@
 import datetime
-import numpy as np
-import pandas as pd
+import math
+from collections import deque, OrderedDict
+
 from v3data.data import UniV3Data
+from v3data.responses import Records
+from v3data.utils import timestamp_ago
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+DAY_SECONDS = 24 * 60 * 60
+NS_PER_SECOND = 10 ** 9
+
+# Number of (pool, period, intervals) band engines kept per process
+ENGINE_CACHE_SIZE = 256
 
 
 class BollingerBand:
@@ -15,24 +28,23 @@ class BollingerBand:
         # Defaults to 10 times the total_period_hour if no report_hours is given
         if not report_hours:
             report_hours = 10 * self.total_period_hours
-        data = self.client.get_historical_pool_prices(
-            self.pool_address, datetime.timedelta(hours=1.1 * report_hours))  # 1.1 factor for buffer
-        df = pd.DataFrame(data, dtype=np.float64)
-        df['datetime'] = pd.to_datetime(df.timestamp, unit='s')
-
-        interval = self.total_period_hours / self.n_intervals
-        df_resampled = df.sort_values('datetime').resample(f"{interval}H", on='datetime').last()
-        df_resampled.fillna(method='ffill', inplace=True)
-        df_resampled['mid'] = df_resampled.priceDecimal.rolling(self.n_intervals).mean()
-        df_resampled['std'] = df_resampled.priceDecimal.rolling(self.n_intervals).std()
-        df_resampled['upper'] = df_resampled['mid'] + 2 * df_resampled['std']
-        df_resampled['lower'] = df_resampled['mid'] - 2 * df_resampled['std']
-        df_resampled.dropna(inplace=True)
-
-        self.df_resampled = df_resampled[['priceDecimal', 'mid', 'upper', 'lower']]
+        timestamp_start = timestamp_ago(datetime.timedelta(hours=1.1 * report_hours))  # 1.1 factor for buffer
+
+        # Resample and roll the bands chunk by chunk as swaps are read,
+        # instead of loading every swap into a frame
+        engine = StreamingBollingerBand(self.total_period_hours, self.n_intervals, keep_history=True)
+        for timestamps, prices in self.client.iter_pool_prices_since(self.pool_address, timestamp_start):
+            engine.update_many(timestamps, prices)
+
+        bands = engine.bands()
+        self.df_resampled = pd.DataFrame(
+            [band[1:] for band in bands],
+            columns=['priceDecimal', 'mid', 'upper', 'lower'],
+            index=pd.DatetimeIndex(pd.to_datetime([band[0] for band in bands], unit='ns'), name='datetime')
+        )
 
     def chart_data(self):
-        pool = self.client.get_pool(self.pool_address)
+        pool = self.client.get_stored_pool(self.pool_address)
         self.get_data()
         df = self.df_resampled.reset_index()
         df.rename(columns={
@@ -43,11 +55,198 @@ class BollingerBand:
         df['group'] = f"{pool['token0']['symbol']}-{pool['token1']['symbol']}"
         df['date'] = df.datetime.dt.strftime('%Y-%m-%dT%H:%M:%SZ')
 
-        return df[['group', 'date', 'value', 'min', 'max']].to_dict('records')
+        return Records.from_frame(df[['group', 'date', 'value', 'min', 'max']])
 
     def latest_bands(self):
-        pool = self.client.get_pool(self.pool_address)
-        self.get_data(report_hours=self.total_period_hours)
-        bands = self.df_resampled.tail(1).reset_index().to_dict("records")[0]
-        bands['datetime'] = bands['datetime'].strftime('%Y-%m-%dT%H:%M:%SZ')
+        pool = self.client.get_stored_pool(self.pool_address)
+        engine = band_engine(self.pool_address, self.total_period_hours, self.n_intervals)
+
+        if engine.last_timestamp is None:
+            timestamp_start = int((datetime.datetime.utcnow() - datetime.timedelta(
+                hours=1.1 * self.total_period_hours)).replace(tzinfo=datetime.timezone.utc).timestamp())
+        else:
+            timestamp_start = engine.last_timestamp + 1
+        timestamps, prices = self.client.get_pool_prices_since(self.pool_address, timestamp_start)
+
+        # Another request may have fed the engine while this one was fetching
+        if engine.last_timestamp is not None:
+            fresh = timestamps > engine.last_timestamp
+            timestamps, prices = timestamps[fresh], prices[fresh]
+        engine.update_many(timestamps, prices)
+
+        bands = engine.latest()
+        if bands:
+            bands['datetime'] = bands['datetime'].strftime('%Y-%m-%dT%H:%M:%SZ')
         return {"pool": pool, "bands": bands}
+
+
+class StreamingBollingerBand:
+    """Bollinger bands updated one swap at a time
+
+    Swaps are bucketed the same way as resample(interval).last() with the
+    buckets anchored at midnight of the first swap's day, and empty buckets
+    carry the previous price forward. Only the last n_intervals bucket
+    prices are kept, together with running sums of their deviations from a
+    reference price, so each update is constant time and reading the latest
+    bands is a lookup. Sums are recomputed every n_intervals updates to keep
+    rounding errors from accumulating.
+    """
+
+    def __init__(self, total_period_hours, n_intervals=20, keep_history=False):
+        self.n_intervals = n_intervals
+        self.interval_ns = round(total_period_hours * 3600 * NS_PER_SECOND / n_intervals)
+        self.keep_history = keep_history
+        self.history = []
+        self.origin = None
+        self.bucket = None
+        self.last_timestamp = None
+        self.prices = deque(maxlen=n_intervals)
+        self.reference = 0.0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.updates = 0
+
+    def _add(self, price):
+        deviation = price - self.reference
+        self.sum += deviation
+        self.sum_squares += deviation * deviation
+
+    def _remove(self, price):
+        deviation = price - self.reference
+        self.sum -= deviation
+        self.sum_squares -= deviation * deviation
+
+    def _recompute(self):
+        self.reference = self.prices[-1]
+        deviations = [price - self.reference for price in self.prices]
+        self.sum = sum(deviations)
+        self.sum_squares = sum(deviation * deviation for deviation in deviations)
+        self.updates = 0
+
+    def _counted(self):
+        self.updates += 1
+        if self.updates >= self.n_intervals:
+            self._recompute()
+
+    def _push(self, price):
+        if len(self.prices) == self.n_intervals:
+            self._remove(self.prices[0])
+        self.prices.append(price)
+        self._add(price)
+        self._counted()
+
+    def _replace_last(self, price):
+        self._remove(self.prices[-1])
+        self.prices[-1] = price
+        self._add(price)
+        self._counted()
+
+    def _stats(self):
+        count = len(self.prices)
+        mid = self.reference + self.sum / count
+        variance = (self.sum_squares - self.sum * self.sum / count) / (count - 1)
+        std = math.sqrt(max(variance, 0.0))
+        return mid, mid + 2 * std, mid - 2 * std
+
+    def _record(self, bucket):
+        if self.keep_history and len(self.prices) == self.n_intervals:
+            self.history.append((self._bucket_start(bucket), self.prices[-1], *self._stats()))
+
+    def _bucket_start(self, bucket):
+        """Bucket start in nanoseconds since epoch"""
+        return self.origin * NS_PER_SECOND + bucket * self.interval_ns
+
+    def _update_bucket(self, bucket, price):
+        if self.bucket is None:
+            self.bucket = bucket
+            self._push(price)
+        elif bucket == self.bucket:
+            self._replace_last(price)
+        elif bucket > self.bucket:
+            self._record(self.bucket)
+            previous_price = self.prices[-1]
+            empty_buckets = range(self.bucket + 1, bucket)
+            if not self.keep_history:
+                # The window is all previous_price after n_intervals empty buckets
+                empty_buckets = empty_buckets[:self.n_intervals]
+            for empty_bucket in empty_buckets:
+                if empty_bucket - self.bucket <= self.n_intervals:
+                    self._push(previous_price)
+                self._record(empty_bucket)
+            self.bucket = bucket
+            self._push(price)
+        else:
+            raise ValueError("Swaps must be added in time order")
+
+    def update(self, timestamp, price):
+        """Add one swap"""
+        timestamp = int(timestamp)
+        if self.origin is None:
+            self.origin = timestamp - timestamp % DAY_SECONDS
+        elif timestamp < self.last_timestamp:
+            raise ValueError("Swaps must be added in time order")
+
+        self._update_bucket((timestamp - self.origin) * NS_PER_SECOND // self.interval_ns, float(price))
+        self.last_timestamp = timestamp
+
+    def update_many(self, timestamps, prices):
+        """Add swaps ordered by timestamp, only the last swap in each bucket matters"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if timestamps.size == 0:
+            return
+
+        if self.origin is None:
+            self.origin = int(timestamps[0]) - int(timestamps[0]) % DAY_SECONDS
+
+        if np.any(np.diff(timestamps) < 0) or (
+                self.last_timestamp is not None and timestamps[0] < self.last_timestamp):
+            raise ValueError("Swaps must be added in time order")
+
+        buckets = (timestamps - self.origin) * NS_PER_SECOND // self.interval_ns
+
+        last_in_bucket = np.flatnonzero(np.diff(buckets, append=buckets[-1] + 1))
+        for bucket, price in zip(buckets[last_in_bucket].tolist(), prices[last_in_bucket].tolist()):
+            self._update_bucket(bucket, price)
+
+        self.last_timestamp = int(timestamps[-1])
+
+    def latest(self):
+        """Bands for the most recent bucket, None until n_intervals buckets are seen"""
+        if len(self.prices) < self.n_intervals:
+            return None
+
+        mid, upper, lower = self._stats()
+        return {
+            "datetime": datetime.datetime(1970, 1, 1) + datetime.timedelta(
+                microseconds=self._bucket_start(self.bucket) // 1000),
+            "priceDecimal": self.prices[-1],
+            "mid": mid,
+            "upper": upper,
+            "lower": lower
+        }
+
+    def bands(self):
+        """Band history for every complete bucket including the current one"""
+        history = list(self.history)
+        if len(self.prices) == self.n_intervals:
+            history.append((self._bucket_start(self.bucket), self.prices[-1], *self._stats()))
+        return history
+
+
+_engines = OrderedDict()
+
+
+def band_engine(pool_address, total_period_hours, n_intervals):
+    """Long lived band engine for pool, kept in a per process LRU"""
+    key = (pool_address.lower(), total_period_hours, n_intervals)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = StreamingBollingerBand(total_period_hours, n_intervals)
+        _engines[key] = engine
+        if len(_engines) > ENGINE_CACHE_SIZE:
+            _engines.popitem(last=False)
+    else:
+        _engines.move_to_end(key)
+
+    return engine
@@ -1,11 +1,13 @@
-import numpy as np
-import pandas as pd
-
 from datetime import timedelta
 
 from v3data import VisorClient
 from v3data.pools import Pool, USDC_WETH_03_POOL
-from v3data.utils import tick_to_priceDecimal, timestamp_ago
+from v3data.utils import tick_to_priceDecimal_array, timestamp_ago
+from v3data.responses import Records
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
 
 BASE_TOKEN_PRIORITY = {
@@ -48,13 +50,14 @@ class BaseLimit:
         """Reshape/flatten query data"""
         rebalances = data['rebalances']
 
-        for rebalance in rebalances:
-            for limit in ['baseLower', 'baseUpper', 'limitLower', 'limitUpper']:
-                rebalance[limit] = tick_to_priceDecimal(
-                    rebalance[limit],
-                    int(data['pool']['token0']['decimals']),
-                    int(data['pool']['token1']['decimals'])
-                )
+        for limit in ['baseLower', 'baseUpper', 'limitLower', 'limitUpper']:
+            prices = tick_to_priceDecimal_array(
+                [rebalance[limit] for rebalance in rebalances],
+                int(data['pool']['token0']['decimals']),
+                int(data['pool']['token1']['decimals'])
+            )
+            for rebalance, price in zip(rebalances, prices.tolist()):
+                rebalance[limit] = price
 
         token0_id = data['pool']['token0']['id']
         token1_id = data['pool']['token1']['id']
@@ -200,7 +203,7 @@ class BaseLimit:
         # Intepolate prices
         df_data.price = df_data.price.interpolate()
         # Extend rebalance ranges
-        df_data = df_data.fillna(method='ffill').dropna().reset_index()
+        df_data = df_data.ffill().dropna().reset_index()
 
         df_data['date'] = pd.to_datetime(df_data.timestamp, unit='s').dt.strftime('%Y-%m-%dT%H:%M:%SZ')
 
@@ -224,7 +227,7 @@ class BaseLimit:
                 'limitUpper'
             ]]
 
-        return df_data.to_dict('records')
+        return Records.from_frame(df_data)
 
     def rebalance_ranges(self, hypervisor_address):
         """Get price/rebalance ranges for one hypervisor"""
@@ -232,8 +235,17 @@ class BaseLimit:
         self._get_pool_data([data['pool']])
         return self._rebalance_ranges(data)
 
-    def all_rebalance_ranges(self):
-        """Get price/rebalance ranges for all hypervisor"""
+    def iter_rebalance_ranges(self):
+        """Yield (hypervisor_id, ranges) one hypervisor at a time
+
+        Only the raw rebalances and hourly prices are held for all
+        hypervisors, each interpolated series can be dropped once consumed.
+        """
         data = self._get_all_data()
         self._get_pool_data([hypervisor_data['pool'] for _, hypervisor_data in data.items()])
-        return {hypervisor_id: self._rebalance_ranges(rebalances) for hypervisor_id, rebalances in data.items()}
+        for hypervisor_id in list(data):
+            yield hypervisor_id, self._rebalance_ranges(data.pop(hypervisor_id))
+
+    def all_rebalance_ranges(self):
+        """Get price/rebalance ranges for all hypervisor"""
+        return dict(self.iter_rebalance_ranges())
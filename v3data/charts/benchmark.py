@@ -1,10 +1,13 @@
 import datetime as dt
-import numpy as np
-import pandas as pd
 
 from v3data import VisorClient, UniswapV2Client
 from v3data.utils import date_to_timestamp
 from v3data.constants import WETH_ADDRESS
+from v3data.responses import Records
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
 V2_BASE_POOLS = {
     # WBTC
@@ -253,4 +256,4 @@ class Benchmark:
         df_all = pd.melt(df_all.reset_index(), ['date'], var_name='group')
         df_all['date'] = pd.to_datetime(df_all.date, unit='s').dt.strftime('%Y-%m-%dT%H:%M:%SZ')
 
-        return df_all.to_dict("records")
+        return Records.from_frame(df_all)
@@ -1,6 +1,10 @@
-import pandas as pd
-import numpy as np
 from v3data import VisorClient
+from v3data.utils import timestamp_to_date
+from v3data.responses import Records
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
 
 class DailyChart:
@@ -84,10 +88,9 @@ class DailyChart:
             "netDepositedUSD": "Net deposits & withdraws"
         }, inplace=True)
 
-        return df_flows.melt(id_vars='key', var_name="group").to_dict('records')
+        return Records.from_frame(df_flows.melt(id_vars='key', var_name="group"))
 
-    def tvl(self):
-        """Total TVL chart broken down by hypervisor"""
+    def _get_tvl_data(self):
         query = """
         query hypervisorDaily($days: Int!){
             uniswapV3Hypervisors(
@@ -121,20 +124,27 @@ class DailyChart:
         }
         """
         variables = {'days': self.days}
-        data = self.visor_client.query(query, variables)['data']['uniswapV3Hypervisors']
+        return self.visor_client.query(query, variables)['data']['uniswapV3Hypervisors']
 
-        df_all = pd.DataFrame()
+    @staticmethod
+    def _tvl_records(data):
+        """Flatten hypervisor day data into chart columns in one pass"""
+        date_strings = {}
+        dates, groups, values = [], [], []
         for hypervisor in data:
-            df_hypervisor = pd.DataFrame(hypervisor['dayData'], dtype=np.float64)
-            df_hypervisor['hypervisor'] = hypervisor['id']
-            df_hypervisor['name'] = f"{hypervisor['pool']['token0']['symbol']}-{hypervisor['pool']['token1']['symbol']}"
-            df_all = pd.concat([df_all, df_hypervisor])
-
-        df_all.date = pd.to_datetime(df_all.date, unit='s').dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+            name = f"{hypervisor['pool']['token0']['symbol']}-{hypervisor['pool']['token1']['symbol']}"
+            for day_data in hypervisor['dayData']:
+                # Many hypervisors share each date, only format it once
+                date = day_data['date']
+                date_string = date_strings.get(date)
+                if date_string is None:
+                    date_string = date_strings[date] = timestamp_to_date(int(date), '%Y-%m-%dT%H:%M:%SZ')
+                dates.append(date_string)
+                groups.append(name)
+                values.append(float(day_data['tvlUSD']))
+
+        return Records({'date': dates, 'group': groups, 'value': np.array(values, dtype=np.float64)})
 
-        df_all.rename(columns={
-            "name": "group",
-            "tvlUSD": "value"
-        }, inplace=True)
-
-        return df_all[['date', 'group', 'value']].to_dict('records')
+    def tvl(self):
+        """Total TVL chart broken down by hypervisor"""
+        return self._tvl_records(self._get_tvl_data())
@@ -1,4 +1,6 @@
 import os
+import tempfile
+from urllib.parse import urlparse
 
 V3_FACTORY_ADDRESS = "0x1F98431c8aD98523631AE4a59f267346ea31F984"
 
@@ -13,18 +15,101 @@ visor_subgraphs = {
     'test': "https://api.thegraph.com/subgraphs/name/l0c4t0r/visor",
 }
 
-THEGRAPH_INDEX_NODE_URL = "https://api.thegraph.com/index-node/graphql"
-ETH_BLOCKS_SUBGRAPH_URL = "https://api.thegraph.com/subgraphs/name/blocklytics/ethereum-blocks"
-UNI_V2_SUBGRAPH_URL = "https://api.thegraph.com/subgraphs/name/ianlapham/uniswapv2"
-UNI_V3_SUBGRAPH_URL = uniswap_subgraphs[os.environ.get('UNISWAP_SUBGRAPH', 'prod')]
-VISOR_SUBGRAPH_URL = visor_subgraphs[os.environ.get('VISOR_SUBGRAPH', 'prod')]
+# Append every subgraph request and its response to this JSONL file
+SUBGRAPH_RECORD_PATH = os.environ.get('SUBGRAPH_RECORD_PATH')
+# Send all subgraph requests to a local stand-in server (python -m v3data.standin)
+# instead, under the same paths as on The Graph
+SUBGRAPH_STANDIN_URL = os.environ.get('SUBGRAPH_STANDIN_URL')
+
+
+def _subgraph_url(url):
+    if SUBGRAPH_STANDIN_URL:
+        return SUBGRAPH_STANDIN_URL.rstrip('/') + urlparse(url).path
+    return url
+
+
+THEGRAPH_INDEX_NODE_URL = _subgraph_url("https://api.thegraph.com/index-node/graphql")
+ETH_BLOCKS_SUBGRAPH_URL = _subgraph_url("https://api.thegraph.com/subgraphs/name/blocklytics/ethereum-blocks")
+UNI_V2_SUBGRAPH_URL = _subgraph_url("https://api.thegraph.com/subgraphs/name/ianlapham/uniswapv2")
+UNI_V3_SUBGRAPH_URL = _subgraph_url(uniswap_subgraphs[os.environ.get('UNISWAP_SUBGRAPH', 'prod')])
+VISOR_SUBGRAPH_URL = _subgraph_url(visor_subgraphs[os.environ.get('VISOR_SUBGRAPH', 'prod')])
 
 
 TOKEN_LIST_URL = "https://tokens.coingecko.com/uniswap/all.json"
+# Local copy of the token list, revalidated against TOKEN_LIST_URL once older than the interval
+TOKEN_LIST_PATH = os.environ.get('TOKEN_LIST_PATH', os.path.join(tempfile.gettempdir(), 'v3data', 'tokens.json'))
+TOKEN_LIST_REFRESH_INTERVAL = int(os.environ.get('TOKEN_LIST_REFRESH_INTERVAL', 6 * 60 * 60))
 
 DEFAULT_BBAND_INTERVALS = 20
+
+# Local copy of swap history used by bollinger bands
+SWAP_STORE_PATH = os.environ.get('SWAP_STORE_PATH', os.path.join(tempfile.gettempdir(), 'v3data', 'swaps.sqlite'))
+# Swaps are kept at least this long, longer if a longer window was asked for
+SWAP_STORE_RETENTION_DAYS = int(os.environ.get('SWAP_STORE_RETENTION_DAYS', 60))
 DEFAULT_TIMEZONE = os.environ.get('TIMEZONE', 'UTC-5')
 
 CHARTS_CACHE_TIMEOUT = os.environ.get('CHARTS_CACHE_TIMEOUT', 600)
 
+# 'ttl' expires cached responses after a fixed timeout, 'block' keys subgraph
+# query results and responses by the latest indexed block instead
+CACHE_MODE = os.environ.get('CACHE_MODE', 'ttl')
+BLOCK_POLL_INTERVAL = float(os.environ.get('BLOCK_POLL_INTERVAL', 5))
+# Upper bound on the lifetime of block keyed responses
+BLOCK_CACHE_TIMEOUT = int(os.environ.get('BLOCK_CACHE_TIMEOUT', 3600))
+BLOCK_QUERY_CACHE_SIZE = int(os.environ.get('BLOCK_QUERY_CACHE_SIZE', 512))
+
+# Block number from timestamp lookups are answered from segments of
+# consecutive blocks fetched once per process (at most PAGE_SIZE blocks each)
+BLOCK_INDEX_SEGMENT_SIZE = int(os.environ.get('BLOCK_INDEX_SEGMENT_SIZE', 1000))
+BLOCK_INDEX_MAX_SEGMENTS = int(os.environ.get('BLOCK_INDEX_MAX_SEGMENTS', 64))
+
+# Response cache backend. SimpleCache is per worker process,
+# v3data.sharedcache.SharedCache is shared by all workers on a host
+CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
+SHARED_CACHE_PATH = os.environ.get(
+    'SHARED_CACHE_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'v3data-cache.sqlite')
+)
+SHARED_CACHE_MAX_BYTES = int(os.environ.get('SHARED_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+SHARED_CACHE_MAX_ENTRIES = int(os.environ.get('SHARED_CACHE_MAX_ENTRIES', 10000))
+
+# Snapshots of heavy endpoints refreshed in the background by one worker per host
+SNAPSHOT_PATH = os.environ.get(
+    'SNAPSHOT_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'v3data-snapshots.sqlite')
+)
+SNAPSHOT_REFRESH_INTERVAL = int(os.environ.get('SNAPSHOT_REFRESH_INTERVAL', 300))
+SNAPSHOT_CHECK_INTERVAL = int(os.environ.get('SNAPSHOT_CHECK_INTERVAL', 10))
+
+# Requested once per host at boot, before workers report ready on /status/ready.
+# Comma separated paths, with query strings for parameter sets
+WARMUP_ROUTES = [
+    route.strip() for route in os.environ.get(
+        'WARMUP_ROUTES', '/charts/dailyTvl,/charts/baseRange/all,/hypervisors/allData'
+    ).split(',') if route.strip()
+]
+# Written by the worker that warmed up, the others wait for it
+WARMUP_MARKER_PATH = os.environ.get(
+    'WARMUP_MARKER_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'v3data-warmup.json')
+)
+
+# Per worker metrics files, summed over all workers on /metrics
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'v3data-metrics')
+)
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+
+# Shared HTTP connection pool used for all subgraph requests
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 100))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+
+# Max number of subgraph requests in flight for one concurrent fan-out
+ASYNC_CONCURRENCY_LIMIT = int(os.environ.get('ASYNC_CONCURRENCY_LIMIT', 8))
+# Upper bound on sub-ranges fetched concurrently by paginate_range_query
+PAGINATE_MAX_PARTITIONS = int(os.environ.get('PAGINATE_MAX_PARTITIONS', 8))
+
 EXCLUDED_HYPERVISORS = []
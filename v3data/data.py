@@ -1,30 +1,23 @@
-import requests
 import datetime
-import numpy as np
-import pandas as pd
 
 from v3data import SubgraphClient
-from v3data.utils import sqrtPriceX96_to_priceDecimal
-from v3data.config import UNI_V3_SUBGRAPH_URL, TOKEN_LIST_URL
+from v3data.aio import gather_queries
+from v3data.swapstore import SwapStore
+from v3data.utils import sqrtPriceX96_to_priceDecimal_array
+from v3data.tokens import token_registry
+from v3data.config import UNI_V3_SUBGRAPH_URL
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
 
 
 class UniV3Data(SubgraphClient):
     def __init__(self):
         super().__init__(UNI_V3_SUBGRAPH_URL)
+        self.swap_store = SwapStore()
 
     def get_token_list(self):
-        response = requests.get(TOKEN_LIST_URL)
-        token_list = response.json()['tokens']
-
-        token_addresses = {}
-        for token in token_list:
-            symbol = token['symbol']
-            if token_addresses.get(symbol):
-                token_addresses[symbol].append(token['address'])
-            else:
-                token_addresses[symbol] = [token['address']]
-
-        return token_addresses
+        return token_registry.token_addresses()
 
     def get_pools_by_tokens(self, token_addresses):
         query0 = """
@@ -78,10 +71,12 @@ class UniV3Data(SubgraphClient):
         }
         """
         variables = {"ids": [address.lower() for address in token_addresses]}
-        pool0 = self.query(query0, variables)['data']['pools']
-        pool1 = self.query(query1, variables)['data']['pools']
+        response0, response1 = gather_queries([
+            (self, query0, variables),
+            (self, query1, variables)
+        ])
 
-        return pool0 + pool1
+        return response0['data']['pools'] + response1['data']['pools']
 
     def get_pool(self, pool_address):
         """Get metadata for pool"""
@@ -108,57 +103,64 @@ class UniV3Data(SubgraphClient):
         variables = {"id": pool_address.lower()}
         return self.query(query, variables)['data']['pool']
 
-    def get_historical_pool_prices(self, pool_address, time_delta=None):
-        pool_address = pool_address.lower()
+    def get_stored_pool(self, pool_address):
+        """Pool metadata from the local store"""
+        return self.swap_store.pool(pool_address.lower(), self.get_pool)
+
+    def iter_swap_pages(self, pool_address, timestamp_start, timestamp_end):
+        """Yield pages of swaps with timestamp_start <= timestamp < timestamp_end"""
         query = """
-            query poolPrices($id: String!, $timestamp_start: Int!){
-                pool(
-                    id: $id
-                ){
-                    swaps(
-                        first: 1000
-                        orderBy: timestamp
-                        orderDirection: asc
-                        where: { timestamp_gte: $timestamp_start }
-                    ){
-                        id
-                        timestamp
-                        sqrtPriceX96
+            query poolPrices($id: String!, $rangeStart: Int!, $rangeEnd: Int!){
+                swaps(
+                    first: 1000
+                    orderBy: timestamp
+                    orderDirection: asc
+                    where: {
+                        pool: $id
+                        timestamp_gte: $rangeStart
+                        timestamp_lt: $rangeEnd
                     }
+                ){
+                    id
+                    timestamp
+                    sqrtPriceX96
                 }
             }
         """
+        variables = {'id': pool_address.lower()}
+        return self.iter_range_pages(query, 'timestamp', timestamp_start, timestamp_end, variables)
 
+    def get_historical_pool_prices(self, pool_address, time_delta=None):
+        """Swap timestamps and prices since time_delta ago, served from the local swap store"""
         if time_delta:
             timestamp_start = int((datetime.datetime.utcnow() - time_delta).replace(
                 tzinfo=datetime.timezone.utc).timestamp())
         else:
             timestamp_start = 0
 
-        variables = {
-            'id': pool_address,
-            "timestamp_start": timestamp_start
-        }
-        has_data = True
-        all_swaps = []
-        while has_data:
-            swaps = (self.query(query, variables))['data']['pool']['swaps']
-
-            all_swaps.extend(swaps)
-            timestamps = set([int(swap['timestamp']) for swap in swaps])
-            variables['timestamp_start'] = max(timestamps)
+        return self.get_pool_prices_since(pool_address, timestamp_start)
 
-            if len(swaps) < 1000:
-                has_data = False
-
-        pool = self.get_pool(pool_address)
-
-        df_swaps = pd.DataFrame(all_swaps, dtype=np.float64)
-        df_swaps.timestamp = df_swaps.timestamp.astype(np.int64)
-        df_swaps.drop_duplicates(inplace=True)
-        df_swaps['priceDecimal'] = df_swaps.sqrtPriceX96.apply(
-            sqrtPriceX96_to_priceDecimal, args=(int(pool['token0']['decimals']), int(pool['token1']['decimals']))
-        )
-        data = df_swaps.to_dict('records')
+    def iter_pool_prices_since(self, pool_address, timestamp_start):
+        """Swap timestamps and prices with timestamp >= timestamp_start as NumPy chunks"""
+        pool_address = pool_address.lower()
 
-        return data
+        pool = None
+        for rows in self.swap_store.iter_window(pool_address, timestamp_start, self.iter_swap_pages):
+            if pool is None:
+                pool = self.get_stored_pool(pool_address)
+
+            timestamps, sqrt_prices = zip(*rows)
+            yield np.array(timestamps, dtype=np.int64), sqrtPriceX96_to_priceDecimal_array(
+                sqrt_prices,
+                int(pool['token0']['decimals']),
+                int(pool['token1']['decimals'])
+            )
+
+    def get_pool_prices_since(self, pool_address, timestamp_start):
+        """Swap timestamps and prices with timestamp >= timestamp_start as NumPy arrays"""
+        chunks = list(self.iter_pool_prices_since(pool_address, timestamp_start))
+        if not chunks:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+
+        timestamps, prices = zip(*chunks)
+        return np.concatenate(timestamps), np.concatenate(prices)
@@ -1,6 +1,3 @@
-import numpy as np
-from pandas import DataFrame
-
 from v3data import VisorClient, UniswapV3Client
 from v3data.config import DEFAULT_TIMEZONE
 from v3data.utils import timestamp_to_date, sqrtPriceX96_to_priceDecimal
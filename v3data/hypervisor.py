@@ -1,12 +1,15 @@
 import logging
-import numpy as np
 from datetime import timedelta
-from pandas import DataFrame
 
 from v3data import VisorClient, UniswapV3Client
+from v3data.aio import run_concurrently
+from v3data.returns import batch_returns, PrefixSum, WindowReturns, trailing_start
 from v3data.utils import timestamp_ago, timestamp_to_date
 from v3data.constants import DAYS_IN_PERIOD
 from v3data.config import EXCLUDED_HYPERVISORS
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
 
 DAY_SECONDS = 24 * 60 * 60
 YEAR_SECONDS = 365 * DAY_SECONDS
@@ -93,7 +96,7 @@ class HypervisorData:
         data = self._get_hypervisor_data(hypervisor_address)
         return data
 
-    def empty_returns(self):
+    def empty_returns(self, periods=DAYS_IN_PERIOD):
         return {
             period: {
                 "cumFeeReturn": 0.0,
@@ -101,70 +104,77 @@ class HypervisorData:
                 "feeApy": 0,
                 "totalPeriodSeconds": 0
             }
-            for period in ['daily', 'weekly', 'monthly']
+            for period in periods
         }
 
-    def _calculate_returns(self, data):
+    def _calculate_returns(self, data, periods=DAYS_IN_PERIOD):
         # Calculations require more than 1 rebalance
         if (not data) or (len(data) < 2):
-            return self.empty_returns()
+            return self.empty_returns(periods)
 
-        df_rebalances = DataFrame(data, dtype=np.float64)
-        df_rebalances = df_rebalances[df_rebalances.totalAmountUSD > 0]
+        timestamp = np.array([float(rebalance['timestamp']) for rebalance in data])
+        gross_fees = np.array([float(rebalance['grossFeesUSD']) for rebalance in data])
+        total_amount = np.array([float(rebalance['totalAmountUSD']) for rebalance in data])
 
-        if df_rebalances.empty:
-            return self.empty_returns()
+        keep = total_amount > 0
+        if not keep.any():
+            return self.empty_returns(periods)
 
-        df_rebalances.sort_values('timestamp', inplace=True)
+        order = np.argsort(timestamp[keep], kind='stable')
+        timestamp, gross_fees, total_amount = timestamp[keep][order], gross_fees[keep][order], total_amount[keep][order]
 
         # Calculate fee return rate for each rebalance event
-        df_rebalances['feeRate'] = df_rebalances.grossFeesUSD / df_rebalances.totalAmountUSD.shift(1)
-        df_rebalances['totalRate'] = df_rebalances.totalAmountUSD / df_rebalances.totalAmountUSD.shift(1) - 1
+        fee_rate = gross_fees / np.r_[np.nan, total_amount[:-1]]
 
         # Time since last rebalance
-        df_rebalances['periodSeconds'] = df_rebalances.timestamp.diff()
-
-        # Calculate returns for using last 1, 7, and 30 days data
-        results = {}
-        for period, days in DAYS_IN_PERIOD.items():
-            timestamp_start = timestamp_ago(timedelta(days=days))
-            df_period = df_rebalances.loc[df_rebalances.timestamp > timestamp_start].copy()
+        period_seconds = np.diff(timestamp, prepend=np.nan)
 
-            if df_period.empty:
-                # if no rebalances in the last 24 hours, calculate using the 24 hours prior to the last rebalance
-                df_rebalances.timestamp.max() - DAY_SECONDS
-                timestamp_start = df_rebalances.timestamp.max() - DAY_SECONDS
-                df_period = df_rebalances.loc[df_rebalances.timestamp > timestamp_start].copy()
+        fee_returns = WindowReturns(fee_rate)
+        total_seconds = PrefixSum(period_seconds)
 
-            # Time since first reblance
-            df_period['totalPeriodSeconds'] = df_period.periodSeconds.cumsum()
+        # Calculate returns for each period from its window of the latest rebalances
+        results = {}
+        for period, days in periods.items():
+            start = trailing_start(timestamp, timestamp_ago(timedelta(days=days)))
 
-            # Compound fee return rate for each rebalance
-            df_period['cumFeeReturn'] = (1 + df_period.feeRate).cumprod() - 1
-            df_period['cumTotalReturn'] = (1 + df_period.totalRate).cumprod() - 1
+            if start == len(timestamp):
+                # if no rebalances in the period, calculate using the 24 hours prior to the last rebalance
+                start = trailing_start(timestamp, timestamp[-1] - DAY_SECONDS)
 
-            # Last row is the cumulative results
-            returns = df_period[['totalPeriodSeconds', 'cumFeeReturn']].tail(1)  # , 'cumTotalReturn'
+            # Undefined if the window is only the first rebalance
+            totalPeriodSeconds = np.float64(total_seconds.sum(start) if not np.isnan(period_seconds[-1]) else np.nan)
+            cumFeeReturn = np.float64(fee_returns.compound(start) if not np.isnan(fee_rate[-1]) else np.nan)
 
-            # Extrapolate linearly to annual rate
-            returns['feeApr'] = returns.cumFeeReturn * (YEAR_SECONDS / returns.totalPeriodSeconds)
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                # Extrapolate linearly to annual rate
+                feeApr = cumFeeReturn * (YEAR_SECONDS / totalPeriodSeconds)
 
-            # Extrapolate by compounding
-            returns['feeApy'] = (1 + returns.cumFeeReturn * (DAY_SECONDS / returns.totalPeriodSeconds)) ** 365 - 1
+                # Extrapolate by compounding
+                feeApy = (1 + cumFeeReturn * (DAY_SECONDS / totalPeriodSeconds)) ** 365 - 1
 
-            results[period] = returns.to_dict('records')[0]
+            results[period] = {
+                "totalPeriodSeconds": float(totalPeriodSeconds),
+                "cumFeeReturn": float(cumFeeReturn),
+                "feeApr": float(feeApr),
+                "feeApy": float(feeApy)
+            }
 
         return results
 
-    def calculate_returns(self, hypervisor_address):
-        data = self.get_rebalance_data(hypervisor_address, timedelta(days=30))
-        return self._calculate_returns(data)
+    def calculate_returns(self, hypervisor_address, periods=DAYS_IN_PERIOD):
+        days = max(30, *periods.values())
+        data = self.get_rebalance_data(hypervisor_address, timedelta(days=days))
+        return self._calculate_returns(data, periods)
 
     def _all_returns(self):
+        hypervisors = [
+            hypervisor for hypervisor in self.all_rebalance_data
+            if hypervisor['id'] not in EXCLUDED_HYPERVISORS
+        ]
+
         results = {}
-        for hypervisor in self.all_rebalance_data:
-            if hypervisor['id'] not in EXCLUDED_HYPERVISORS:
-                results[hypervisor['id']] = self._calculate_returns(hypervisor['rebalances'])
+        for hypervisor, returns in zip(hypervisors, batch_returns(hypervisors)):
+            results[hypervisor['id']] = returns or self.empty_returns()
 
         return results
 
@@ -172,7 +182,8 @@ class HypervisorData:
         self._get_all_rebalance_data(timedelta(days=30))
         return self._all_returns()
 
-    def all_data(self):
+    def _get_basics_and_pools(self):
+        """Hypervisor basics and the current state of their pools"""
         query_basics = """
         {
             uniswapV3Hypervisors(
@@ -234,7 +245,14 @@ class HypervisorData:
         pools_data = self.uniswap_client.query(query_pool, variables)['data']['pools']
         pools = {pool.pop('id'): pool for pool in pools_data}
 
-        returns = self.all_returns()
+        return basics, pools
+
+    def all_data(self):
+        # The pools query depends on the basics, returns are independent of both
+        (basics, pools), returns = run_concurrently(
+            self._get_basics_and_pools,
+            self.all_returns
+        )
 
         results = {}
         for hypervisor in basics:
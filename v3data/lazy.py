@@ -0,0 +1,67 @@
+import importlib.util
+import sys
+import threading
+import types
+
+# Held while a lazy module executes, so other threads wait for it to
+# finish instead of seeing it half initialized
+_load_lock = threading.RLock()
+_loading = set()
+_lazy_modules = []
+
+
+class _LazyModule(types.ModuleType):
+    """Module executed on first attribute access, by one thread"""
+
+    def __getattribute__(self, attr):
+        with _load_lock:
+            # Attributes are read while the module executes, e.g. __path__
+            # by imports of its submodules
+            if type(self) is _LazyModule and id(self) not in _loading:
+                _loading.add(id(self))
+                try:
+                    _load(self)
+                finally:
+                    _loading.discard(id(self))
+        return types.ModuleType.__getattribute__(self, attr)
+
+
+def _load(module):
+    spec = types.ModuleType.__getattribute__(module, '__spec__')
+    module_dict = types.ModuleType.__getattribute__(module, '__dict__')
+    # Attributes set before loading, such as imported submodules, are kept
+    attrs_then = spec.loader_state['__dict__']
+    attrs_updated = {
+        key: value for key, value in module_dict.items()
+        if key not in attrs_then or value is not attrs_then[key]
+    }
+    spec.loader.exec_module(module)
+    module_dict.update(attrs_updated)
+    module.__class__ = types.ModuleType
+
+
+def lazy_import(name):
+    """Module name, executed the first time one of its attributes is used
+
+    Lets heavy dependencies such as pandas be imported at the top of a
+    module while only the code paths using them pay for loading them.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    module.__class__ = _LazyModule
+    _lazy_modules.append(module)
+    return module
+
+
+def load_all():
+    """Execute every lazy module now, for a master preloading for its workers"""
+    for module in _lazy_modules:
+        getattr(module, '__name__')
@@ -0,0 +1,78 @@
+import contextvars
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+_request_memo = contextvars.ContextVar('request_memo', default=None)
+
+
+class RequestMemo:
+    """Data loaded while serving one request, shared by every calculator
+
+    Loads with the same key run once per request, concurrent loads of a key
+    wait for the first one. Upstream subgraph calls are counted per subgraph.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._key_locks = {}
+        self.upstream_calls = Counter()
+
+    def get(self, key, load):
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+            value = load()
+            with self._lock:
+                self._values[key] = value
+                del self._key_locks[key]
+        return value
+
+    def count_upstream_call(self, subgraph):
+        with self._lock:
+            self.upstream_calls[subgraph] += 1
+
+    @property
+    def total_upstream_calls(self):
+        return sum(self.upstream_calls.values())
+
+
+@contextmanager
+def request_memo():
+    """Share data loads within the block, nested blocks use the outer memo"""
+    memo = _request_memo.get()
+    if memo is not None:
+        yield memo
+        return
+
+    memo = RequestMemo()
+    token = _request_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _request_memo.reset(token)
+
+
+def current_memo():
+    return _request_memo.get()
+
+
+def memoized(key, load):
+    """Result of load, run once per request for key (every time outside one)"""
+    memo = _request_memo.get()
+    if memo is None:
+        return load()
+    return memo.get(key, load)
+
+
+def count_upstream_call(subgraph):
+    memo = _request_memo.get()
+    if memo is not None:
+        memo.count_upstream_call(subgraph)
@@ -0,0 +1,240 @@
+import contextvars
+import glob
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from v3data.config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+from v3data.process import after_fork
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# name: (type, help, buckets)
+METRICS = {
+    'subgraph_query_seconds': (
+        'histogram', "Subgraph query time seen by the caller, including cache hits and shared requests", SECONDS_BUCKETS
+    ),
+    'subgraph_request_seconds': ('histogram', "Upstream subgraph request time", SECONDS_BUCKETS),
+    'subgraph_response_bytes': ('histogram', "Upstream subgraph response size", BYTES_BUCKETS),
+    'subgraph_errors_total': ('counter', "Subgraph responses with errors", None),
+    'subgraph_paginated_seconds': ('histogram', "Time to fetch all pages of a paginated query", SECONDS_BUCKETS),
+    'subgraph_pages_total': ('counter', "Pages fetched by paginated queries", None),
+    'http_request_stage_seconds': (
+        'histogram', "Time spent per stage of a request: subgraph, calculation, serialization and total",
+        SECONDS_BUCKETS
+    ),
+    'http_requests_total': ('counter', "Requests served", None),
+    'http_request_upstream_calls': ('histogram', "Upstream subgraph calls made per request", COUNT_BUCKETS)
+}
+
+_request_timing = contextvars.ContextVar('request_timing', default=None)
+
+
+@lru_cache(maxsize=1024)
+def query_fingerprint(query):
+    """Operation name and a short hash of the query text, a bounded label"""
+    normalized = ' '.join(query.split())
+    match = re.match(r'(?:query|mutation)\s+(\w+)', normalized)
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:8]
+    return f"{match.group(1)}:{digest}" if match else digest
+
+
+class Metrics:
+    """Counters and histograms of this process, exposed for all workers
+
+    Each process periodically writes its samples to its own file in path,
+    scrapes sum the files of every worker. Files of exited workers are
+    kept so counters never go backwards, they are cleared when the server
+    starts.
+    """
+
+    def __init__(self, path=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._flushed = 0
+        self._pid = None
+        self._file = None
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def _process_file(self):
+        # Forked workers start with no samples of their own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._file = os.path.join(self.path, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+            self._samples = {}
+        return self._file
+
+    def _sample(self, name, labels):
+        self._process_file()
+        kind, _, buckets = METRICS[name]
+        key = (name, tuple(sorted(labels.items())))
+        sample = self._samples.get(key)
+        if sample is None:
+            # Histograms are per bucket counts, then sum and count
+            sample = self._samples[key] = [0] * (len(buckets) + 3) if kind == 'histogram' else [0]
+        return sample
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._sample(name, labels)[0] += amount
+        self._maybe_flush()
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        with self._lock:
+            sample = self._sample(name, labels)
+            i = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            sample[i] += 1
+            sample[-2] += value
+            sample[-1] += 1
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the samples of this process to its file"""
+        with self._lock:
+            path = self._process_file()
+            content = json.dumps([[name, labels, sample] for (name, labels), sample in self._samples.items()])
+            self._flushed = time.monotonic()
+
+        os.makedirs(self.path, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+
+    def collect(self):
+        """Samples summed over the files of all workers"""
+        self.flush()
+
+        totals = {}
+        for path in glob.glob(os.path.join(self.path, '*.json')):
+            try:
+                with open(path) as metrics_file:
+                    samples = json.load(metrics_file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, sample in samples:
+                if name not in METRICS:
+                    continue
+                key = (name, tuple(tuple(label) for label in labels))
+                total = totals.get(key)
+                if total is None or len(total) != len(sample):
+                    totals[key] = list(sample)
+                else:
+                    totals[key] = [a + b for a, b in zip(total, sample)]
+        return totals
+
+    def render(self):
+        """All workers' samples in the Prometheus text exposition format"""
+        by_name = defaultdict(list)
+        for (name, labels), sample in sorted(self.collect().items()):
+            by_name[name].append((labels, sample))
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, sample in by_name.get(name, []):
+                if kind == 'counter':
+                    lines.append(f"{name}{_labels(labels)} {_value(sample[0])}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + [math.inf], sample[:-2]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _value(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_value(sample[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {sample[-1]}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _value(value):
+    if value == math.inf:
+        return '+Inf'
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+class RequestTiming:
+    """Time spent per stage while serving one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = defaultdict(float)
+
+
+def start_request():
+    _request_timing.set(RequestTiming())
+
+
+def add_stage_time(stage, seconds):
+    """Count seconds towards stage of the request being served, if any"""
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.stages[stage] += seconds
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage_time(name, time.perf_counter() - start)
+
+
+def finish_request(route, status):
+    """Record the stages of the request being served"""
+    timing = _request_timing.get()
+    if timing is None:
+        return
+    _request_timing.set(None)
+
+    stages = dict(timing.stages)
+    # Subgraph requests are made while calculating, concurrent ones overlap
+    if 'calculation' in stages:
+        stages['calculation'] = max(stages['calculation'] - stages.get('subgraph', 0), 0)
+    stages['total'] = time.perf_counter() - timing.start
+
+    for stage_name, seconds in stages.items():
+        registry.observe('http_request_stage_seconds', seconds, route=route, stage=stage_name)
+    registry.inc('http_requests_total', route=route, status=str(status))
+
+
+registry = Metrics()
+after_fork(registry.reset_after_fork)
@@ -1,15 +1,18 @@
 import datetime
 from v3data import UniswapV3Client
 from v3data.data import UniV3Data
-from v3data.utils import sqrtPriceX96_to_priceDecimal
+from v3data.tokens import token_registry
+from v3data.utils import sqrtPriceX96_to_priceDecimal_array
 
 USDC_WETH_03_POOL = '0x8ad599c3a0ff1de082011efddc58f1908eb6e6d8'
 
 
 def pools_from_symbol(symbol):
+    token_addresses = token_registry.addresses(symbol)
+    if not token_addresses:
+        return []
+
     client = UniV3Data()
-    token_list = client.get_token_list()
-    token_addresses = token_list.get(symbol.upper())
     pool_list = client.get_pools_by_tokens(token_addresses)
 
     pools = [
@@ -96,19 +99,19 @@ class Pool:
         variables = {"pools": [pool.lower() for pool in pools], "hours": hours}
         data = self.client.query(query, variables)['data']['pools']
 
-        pool_prices = {
-            pool['id']: [
+        pool_prices = {}
+        for pool in data:
+            prices = sqrtPriceX96_to_priceDecimal_array(
+                [hour_data['sqrtPrice'] for hour_data in pool['poolHourData']],
+                int(pool['token0']['decimals']),
+                int(pool['token1']['decimals'])
+            )
+            pool_prices[pool['id']] = [
                 {
                     "timestamp": hour_data['periodStartUnix'],
-                    "price": sqrtPriceX96_to_priceDecimal(
-                        float(hour_data['sqrtPrice']),
-                        int(pool['token0']['decimals']),
-                        int(pool['token1']['decimals'])
-                    )
+                    "price": price
                 }
-                for hour_data in pool['poolHourData']
+                for hour_data, price in zip(pool['poolHourData'], prices.tolist())
             ]
-            for pool in data
-        }
 
         return pool_prices
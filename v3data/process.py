@@ -0,0 +1,34 @@
+"""Process local state for workers forked from a preloaded master
+
+With PRELOAD_APP the app is imported once in the gunicorn master and
+workers share its memory copy-on-write. Locks, in flight calls and
+threads created in the master must not carry over, every module holding
+such state registers a reset run in each worker after it is forked.
+"""
+import logging
+
+from v3data import lazy
+
+logger = logging.getLogger(__name__)
+
+_resets = []
+
+
+def after_fork(reset):
+    """Register reset to run in every worker forked from a preloaded master"""
+    _resets.append(reset)
+    return reset
+
+
+def reset_after_fork():
+    for reset in _resets:
+        reset()
+
+
+def preload():
+    """Load in the master what every worker would, to share it copy-on-write"""
+    from v3data.tokens import token_registry
+
+    lazy.load_all()
+    if not token_registry.load():
+        logger.warning("No token list on disk to preload, workers fetch it on first use")
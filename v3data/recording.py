@@ -0,0 +1,58 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    """Query text with whitespace collapsed, so formatting does not matter"""
+    return ' '.join(query.split())
+
+
+class Recorder:
+    """Appends subgraph requests and their responses to a JSONL file
+
+    One line per upstream request, {"url", "query", "variables", "response"},
+    as replayed by the stand-in server in v3data.standin. Lines are written
+    whole under a file lock, so all workers can record to the same file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def record(self, url, params, content):
+        try:
+            response = json.loads(content)
+        except ValueError:
+            # e.g. an HTML error page from the gateway, nothing to replay
+            logger.warning(f"Not recording non JSON response from {url}")
+            return
+
+        line = json.dumps({
+            "url": url,
+            "query": normalize_query(params['query']),
+            "variables": params.get('variables') or {},
+            "response": response
+        }, sort_keys=True) + '\n'
+
+        with self._lock, open(self.path, 'a') as record_file:
+            fcntl.flock(record_file, fcntl.LOCK_EX)
+            try:
+                record_file.write(line)
+            finally:
+                fcntl.flock(record_file, fcntl.LOCK_UN)
+
+
+def read_recordings(path):
+    with open(path) as record_file:
+        for line in record_file:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,252 @@
+import json
+import math
+
+import msgpack
+import orjson
+from flask import Response, request, stream_with_context
+
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+MSGPACK_MIMETYPES = ['application/msgpack', 'application/x-msgpack']
+
+NON_FINITE = {
+    'nan': b'NaN',
+    'inf': b'Infinity',
+    '-inf': b'-Infinity'
+}
+
+
+class Records:
+    """Chart records stored as columns
+
+    Behaves like the list of dicts DataFrame.to_dict('records') returns,
+    but is serialized straight from its columns without building a dict
+    per row. Numeric columns are NumPy arrays, other columns lists.
+    """
+
+    def __init__(self, columns):
+        self.columns = {
+            name: values if isinstance(values, (np.ndarray, list)) else list(values)
+            for name, values in columns.items()
+        }
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Columns must have the same length")
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls({
+            name: np.ascontiguousarray(df[name].to_numpy()) if df[name].dtype.kind in 'fiub' else df[name].tolist()
+            for name in df.columns
+        })
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        names = list(self.columns)
+        columns = [
+            values.tolist() if isinstance(values, np.ndarray) else values
+            for values in self.columns.values()
+        ]
+        for row in zip(*columns):
+            yield dict(zip(names, row))
+
+    def __getitem__(self, index):
+        return {
+            name: values[index].item() if isinstance(values, np.ndarray) else values[index]
+            for name, values in self.columns.items()
+        }
+
+    def __eq__(self, other):
+        if isinstance(other, Records):
+            other = list(other)
+        return list(self) == other
+
+    def __repr__(self):
+        return f"Records({list(self.columns)}, length={len(self)})"
+
+    def to_json(self):
+        names = sorted(self.columns)
+        if not names or not len(self):
+            return b'[]'
+
+        # Interleave the key parts shared by all rows with the column
+        # fragments and join once, every slice assignment runs at C speed
+        n_rows, step = len(self), 2 * len(names)
+        parts = [None] * (n_rows * step + 1)
+        for i, name in enumerate(names):
+            key = (b'},{' if i == 0 else b',') + orjson.dumps(name) + b':'
+            parts[2 * i:-1:step] = [key] * n_rows
+            parts[2 * i + 1:-1:step] = _encode_column(self.columns[name])
+        parts[0] = b'[{' + parts[0][3:]
+        parts[-1] = b'}]'
+
+        return b''.join(parts)
+
+
+def _encode_column(values):
+    """JSON fragments of each value in a column"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'fiub':
+        values = np.ascontiguousarray(values)
+        if values.dtype.kind == 'f':
+            values = values.astype(np.float64, copy=False)
+        fragments = orjson.dumps(values, option=ORJSON_OPTIONS)[1:-1].split(b',')
+
+        if values.dtype.kind == 'f':
+            # Same as the stdlib encoder instead of null
+            for i in np.flatnonzero(~np.isfinite(values)).tolist():
+                fragments[i] = NON_FINITE[repr(float(values[i]))]
+        return fragments
+
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    try:
+        # Mostly a handful of group names and dates repeated on every row
+        encoded = {value: dumps(value) for value in set(values)}
+    except TypeError:
+        # Unhashable values
+        return [dumps(value) for value in values]
+    return list(map(encoded.__getitem__, values))
+
+
+def _default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, Records):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _has_records(obj):
+    return any(
+        isinstance(value, Records) or (isinstance(value, dict) and _has_records(value))
+        for value in obj.values()
+    )
+
+
+def _has_non_finite(obj):
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    if isinstance(obj, np.ndarray):
+        return obj.dtype.kind in 'fc' and not np.isfinite(obj).all()
+    if isinstance(obj, np.floating):
+        return not np.isfinite(obj)
+    if isinstance(obj, Records):
+        return _has_non_finite(obj.columns)
+    return False
+
+
+def dumps(obj):
+    """Serialize obj to JSON bytes
+
+    Output parses the same as Flask's stdlib based jsonify, keys sorted and
+    NaN/Infinity written out. orjson is used where it can produce that, the
+    stdlib encoder otherwise: orjson writes NaN as null, rejects integers
+    beyond 64 bits and non string keys.
+    """
+    if isinstance(obj, Records):
+        return obj.to_json()
+
+    if isinstance(obj, dict) and _has_records(obj):
+        return b'{' + b','.join(
+            dumps(str(key)) + b':' + dumps(obj[key]) for key in sorted(obj, key=str)
+        ) + b'}'
+
+    try:
+        content = orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    except TypeError:
+        content = None
+
+    # orjson writes NaN and Infinity as null, a real None also is
+    if content is None or (b'null' in content and _has_non_finite(obj)):
+        content = json.dumps(
+            obj, default=_default, sort_keys=True, separators=(',', ':')
+        ).encode()
+
+    return content
+
+
+def columnar(obj):
+    """Replace Records with one array per field"""
+    if isinstance(obj, Records):
+        return obj.columns
+    if isinstance(obj, dict):
+        return {key: columnar(value) for key, value in obj.items()}
+    return obj
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, Records):
+        return obj.columns
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind in 'fiub':
+            # Raw little endian float64, readable as a Float64Array
+            return obj.astype('<f8').tobytes()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, int):
+        # Beyond 64 bits, sent as float as JavaScript parses it from JSON anyway
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+
+def packb(obj):
+    """Serialize obj to MessagePack, Records as columns
+
+    Numeric columns are packed as bin of little endian float64 values.
+    """
+    return msgpack.packb(obj, default=_msgpack_default)
+
+
+def wants_msgpack():
+    best = request.accept_mimetypes.best_match(['application/json'] + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+
+def json_response(obj, status=200):
+    return Response(dumps(obj) + b'\n', status=status, mimetype='application/json')
+
+
+def ndjson_lines(items):
+    """One JSON object per line for each (key, value) pair of items"""
+    for key, value in items:
+        yield dumps({key: value}) + b'\n'
+
+
+def ndjson_response(items):
+    """Chunked response written as items are produced
+
+    Only one item needs to be in memory at a time and the first line is
+    sent as soon as it is ready.
+    """
+    return Response(stream_with_context(ndjson_lines(items)), mimetype='application/x-ndjson')
+
+
+def render(obj, status=200):
+    """Response in the format the request asks for
+
+    JSON by default, one array per field of chart records with
+    ?format=columnar, MessagePack (always columnar) if preferred in Accept.
+    """
+    if wants_msgpack():
+        response = Response(packb(obj), status=status, mimetype='application/msgpack')
+    elif request.args.get('format') == 'columnar':
+        response = json_response(columnar(obj), status=status)
+    else:
+        response = json_response(obj, status=status)
+
+    response.vary.add('Accept')
+    return response
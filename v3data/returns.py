@@ -0,0 +1,162 @@
+import math
+from datetime import timedelta
+
+from v3data.utils import timestamp_ago
+from v3data.constants import DAYS_IN_PERIOD
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+DAY_SECONDS = 24 * 60 * 60
+YEAR_SECONDS = 365 * DAY_SECONDS
+
+
+class PrefixSum:
+    """Sum of any slice of a series in constant time
+
+    Trailing slices, the common case, are read from suffix sums so they do
+    not lose precision to cancellation. Undefined (NaN) values are skipped,
+    like pandas cumsum does.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = np.where(np.isnan(values), 0.0, values)
+        self._prefix = np.r_[0.0, np.cumsum(values)]
+        self._suffix = np.r_[np.cumsum(values[::-1])[::-1], 0.0]
+
+    def __len__(self):
+        return len(self._prefix) - 1
+
+    def sum(self, start=0, end=None):
+        if end is None or end == len(self):
+            return self._suffix[start]
+        return self._prefix[end] - self._prefix[start]
+
+
+class WindowReturns:
+    """Compounded return of any slice of a series of rates in constant time
+
+    Prefix sums of log(1 + rate) are built once, so the return over any
+    window is a single subtraction instead of a fresh cumprod. Undefined
+    rates are skipped, like pandas cumprod does.
+    """
+
+    def __init__(self, rates):
+        with np.errstate(invalid='ignore'):
+            self.log_growth = PrefixSum(np.log1p(np.asarray(rates, dtype=np.float64)))
+
+    def __len__(self):
+        return len(self.log_growth)
+
+    def compound(self, start=0, end=None):
+        return math.expm1(self.log_growth.sum(start, end))
+
+
+def trailing_start(timestamps, timestamp_start):
+    """Index of the first of the sorted timestamps after timestamp_start"""
+    return int(np.searchsorted(timestamps, timestamp_start, side='right'))
+
+
+def _window_reduce(ufunc, values, starts, ends):
+    """Reduce values[starts[i]:ends[i]] for every (non empty) window
+
+    Windows are disjoint and ordered, so one reduceat over the interleaved
+    bounds reduces them in order, the gaps in between are dropped.
+    """
+    padded = np.append(values, ufunc.identity)
+    bounds = np.empty(2 * len(starts), dtype=np.intp)
+    bounds[0::2] = starts
+    bounds[1::2] = ends
+    return ufunc.reduceat(padded, bounds)[0::2]
+
+
+def batch_returns(hypervisors, periods=DAYS_IN_PERIOD):
+    """Fee returns of all hypervisors from their rebalances in one pass
+
+    Same results as HypervisorData._calculate_returns for every hypervisor,
+    with all rebalances held in flat arrays sorted by (hypervisor, timestamp)
+    so every period window is a suffix of its hypervisor's rows. Returns a
+    list aligned with hypervisors, None where there is not enough data.
+    """
+    results = [None] * len(hypervisors)
+
+    group, timestamp, gross_fees, total_amount = [], [], [], []
+    for i, hypervisor in enumerate(hypervisors):
+        rebalances = hypervisor['rebalances']
+        # Calculations require more than 1 rebalance
+        if len(rebalances) < 2:
+            continue
+        for rebalance in rebalances:
+            group.append(i)
+            timestamp.append(float(rebalance['timestamp']))
+            gross_fees.append(float(rebalance['grossFeesUSD']))
+            total_amount.append(float(rebalance['totalAmountUSD']))
+
+    group = np.array(group, dtype=np.intp)
+    timestamp = np.array(timestamp, dtype=np.float64)
+    gross_fees = np.array(gross_fees, dtype=np.float64)
+    total_amount = np.array(total_amount, dtype=np.float64)
+
+    keep = total_amount > 0
+    group, timestamp, gross_fees, total_amount = group[keep], timestamp[keep], gross_fees[keep], total_amount[keep]
+    if len(group) == 0:
+        return results
+
+    order = np.lexsort((timestamp, group))
+    group, timestamp, gross_fees, total_amount = group[order], timestamp[order], gross_fees[order], total_amount[order]
+
+    # Row bounds of each hypervisor
+    group_starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    group_ends = np.r_[group_starts[1:], len(group)]
+    group_ids = group[group_starts]
+    first_row = np.zeros(len(group), dtype=bool)
+    first_row[group_starts] = True
+
+    # Fee return rate and time since the previous rebalance, undefined on the first one
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fee_rate = np.where(first_row, np.nan, gross_fees / np.r_[np.nan, total_amount[:-1]])
+    period_seconds = np.where(first_row, np.nan, np.diff(timestamp, prepend=np.nan))
+
+    # Undefined values are skipped by the running sum and product,
+    # the result is only undefined if the last row of the window is
+    growth = np.where(np.isnan(fee_rate), 1.0, 1 + fee_rate)
+    seconds = np.where(np.isnan(period_seconds), 0.0, period_seconds)
+
+    # If no rebalances in a period, the 24 hours prior to the last rebalance are used
+    last_timestamp = np.repeat(timestamp[group_ends - 1], group_ends - group_starts)
+    in_fallback = np.add.reduceat((timestamp > last_timestamp - DAY_SECONDS).astype(np.intp), group_starts)
+
+    period_returns = {}
+    for period, days in periods.items():
+        timestamp_start = timestamp_ago(timedelta(days=days))
+        in_window = np.add.reduceat((timestamp > timestamp_start).astype(np.intp), group_starts)
+        window_starts = group_ends - np.where(in_window > 0, in_window, in_fallback)
+
+        total_period_seconds = _window_reduce(np.add, seconds, window_starts, group_ends)
+        cum_fee_return = _window_reduce(np.multiply, growth, window_starts, group_ends) - 1
+
+        last = group_ends - 1
+        total_period_seconds[np.isnan(period_seconds[last])] = np.nan
+        cum_fee_return[np.isnan(fee_rate[last])] = np.nan
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # Extrapolate linearly to annual rate
+            fee_apr = cum_fee_return * (YEAR_SECONDS / total_period_seconds)
+            # Extrapolate by compounding
+            fee_apy = (1 + cum_fee_return * (DAY_SECONDS / total_period_seconds)) ** 365 - 1
+
+        period_returns[period] = (total_period_seconds, cum_fee_return, fee_apr, fee_apy)
+
+    for j, i in enumerate(group_ids.tolist()):
+        results[i] = {
+            period: {
+                "totalPeriodSeconds": float(total_period_seconds[j]),
+                "cumFeeReturn": float(cum_fee_return[j]),
+                "feeApr": float(fee_apr[j]),
+                "feeApy": float(fee_apy[j])
+            }
+            for period, (total_period_seconds, cum_fee_return, fee_apr, fee_apy) in period_returns.items()
+        }
+
+    return results
@@ -0,0 +1,71 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from v3data.process import after_fork
+from v3data.config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT
+)
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+@after_fork
+def _reset_session_lock():
+    global _session_lock
+    _session_lock = threading.Lock()
+
+
+def _create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_SIZE,
+        pool_block=False
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive'
+    })
+    return session
+
+
+def get_session():
+    """Keep-alive session shared by every client in this process
+
+    Connections are never shared across processes, a forked worker
+    gets a fresh pool the first time it makes a request.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _create_session()
+                _session_pid = pid
+
+    return _session
+
+
+def post(url, **kwargs):
+    """POST through the shared pool with default timeouts"""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return get_session().post(url, **kwargs)
+
+
+def get(url, **kwargs):
+    """GET through the shared pool with default timeouts"""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return get_session().get(url, **kwargs)
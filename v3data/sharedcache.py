@@ -0,0 +1,154 @@
+import os
+import pickle
+import sqlite3
+import time
+
+from flask_caching.backends.base import BaseCache
+
+from v3data.config import SHARED_CACHE_PATH, SHARED_CACHE_MAX_BYTES, SHARED_CACHE_MAX_ENTRIES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class SharedCache(BaseCache):
+    """Cache shared by all worker processes on a host
+
+    Entries live in an SQLite database, by default on /dev/shm so it is
+    memory backed. Every entry has its own expiry, and once the cache is
+    over max_bytes or max_entries the least recently used entries are
+    evicted.
+    """
+
+    def __init__(
+        self,
+        path=SHARED_CACHE_PATH,
+        max_bytes=SHARED_CACHE_MAX_BYTES,
+        max_entries=SHARED_CACHE_MAX_ENTRIES,
+        default_timeout=300
+    ):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        return cls(*args, default_timeout=kwargs.get('default_timeout', 300))
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _expires(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        timeout = int(timeout)
+        return time.time() + timeout if timeout > 0 else 0
+
+    def _evict(self, connection):
+        """Drop expired entries, then least recently used ones until within limits"""
+        connection.execute("DELETE FROM entries WHERE expires != 0 AND expires <= ?", (time.time(),))
+        count, total_size = connection.execute("SELECT count(*), coalesce(sum(size), 0) FROM entries").fetchone()
+
+        excess_entries = count - self.max_entries
+        excess_bytes = total_size - self.max_bytes
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+
+        evict = []
+        for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            evict.append((key,))
+            excess_entries -= 1
+            excess_bytes -= size
+        connection.executemany("DELETE FROM entries WHERE key = ?", evict)
+
+    def get(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, expires = row
+            with connection:
+                if expires != 0 and expires <= time.time():
+                    connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    return None
+                connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        finally:
+            connection.close()
+
+        return pickle.loads(value)
+
+    def _set(self, key, value, timeout, overwrite):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return False
+
+        connection = self._connect()
+        try:
+            with connection:
+                now = time.time()
+                if not overwrite:
+                    row = connection.execute("SELECT expires FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row and (row[0] == 0 or row[0] > now):
+                        return False
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, self._expires(timeout), now, len(data))
+                )
+                self._evict(connection)
+        finally:
+            connection.close()
+
+        return True
+
+    def set(self, key, value, timeout=None):
+        return self._set(key, value, timeout, overwrite=True)
+
+    def add(self, key, value, timeout=None):
+        return self._set(key, value, timeout, overwrite=False)
+
+    def delete(self, key):
+        connection = self._connect()
+        try:
+            with connection:
+                deleted = connection.execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount
+        finally:
+            connection.close()
+        return bool(deleted)
+
+    def has(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT expires FROM entries WHERE key = ?", (key,)).fetchone()
+        finally:
+            connection.close()
+        return bool(row) and (row[0] == 0 or row[0] > time.time())
+
+    def clear(self):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM entries")
+        finally:
+            connection.close()
+        return True
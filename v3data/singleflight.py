@@ -0,0 +1,48 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single call
+
+    The first caller for a key runs the function, callers arriving while it
+    is in flight wait for it and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self.reset_after_fork()
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if leader:
+            try:
+                call.result = function()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+
+        return call.result
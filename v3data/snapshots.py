@@ -0,0 +1,224 @@
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial, wraps
+
+from flask import Response, request
+
+from v3data.memo import request_memo
+from v3data.singleflight import SingleFlight
+from v3data.responses import wants_msgpack
+from v3data.config import SNAPSHOT_PATH, SNAPSHOT_REFRESH_INTERVAL, SNAPSHOT_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for a snapshot another worker is computing
+WAIT_INTERVAL = 0.25
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    path TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    mimetype TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+class SnapshotRefresher:
+    """Serve heavy endpoints from snapshots recomputed in the background
+
+    Responses of registered paths (requested without query parameters) are
+    stored in a database shared by all workers on the host. A snapshot is
+    replaced in a single transaction once its refresh succeeds, so requests
+    always get the last good snapshot, with its age in X-Snapshot-Age.
+    Refreshes are guarded by a file lock so only one worker per host
+    recomputes at a time.
+    """
+
+    def __init__(
+        self,
+        app=None,
+        path=SNAPSHOT_PATH,
+        refresh_interval=SNAPSHOT_REFRESH_INTERVAL,
+        check_interval=SNAPSHOT_CHECK_INTERVAL
+    ):
+        self.app = app
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+        self.views = {}
+        self._thread = None
+        self._revalidating = threading.Lock()
+        self._inflight = SingleFlight()
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def reset_after_fork(self):
+        self._thread = None
+        self._revalidating = threading.Lock()
+        self._inflight = SingleFlight()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @contextmanager
+    def _refresh_lock(self):
+        """Yields True if this process holds the host wide refresh lock"""
+        with open(self.lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, path):
+        """Latest snapshot as (body, mimetype, created) or None"""
+        connection = self._connect()
+        try:
+            return connection.execute(
+                "SELECT body, mimetype, created FROM snapshots WHERE path = ?", (path,)
+            ).fetchone()
+        finally:
+            connection.close()
+
+    def publish(self, path, body, mimetype):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO snapshots (path, body, mimetype, created) VALUES (?, ?, ?, ?)",
+                    (path, body, mimetype, time.time())
+                )
+        finally:
+            connection.close()
+
+    def refresh(self, path):
+        """Recompute snapshot for path, keeping the old one on failure"""
+        view = self.views[path]
+        start = time.time()
+        try:
+            with self.app.test_request_context(path), request_memo():
+                response = self.app.make_response(view())
+        except Exception:
+            logger.exception(f"Snapshot refresh failed for {path}")
+            return False
+
+        if response.status_code != 200:
+            logger.warning(f"Snapshot refresh for {path} returned {response.status_code}")
+            return False
+
+        self.publish(path, response.get_data(), response.mimetype)
+        logger.info(f"Refreshed snapshot {path} in {time.time() - start:.1f}s")
+        return True
+
+    def _compute_missing(self, path, args, kwargs):
+        """Compute and publish a missing snapshot as (body, mimetype, status)
+
+        Only the worker holding the host wide lock computes, the others wait
+        for its snapshot, and take over if it fails.
+        """
+        while True:
+            with self._refresh_lock() as acquired:
+                if acquired:
+                    snapshot = self.get(path)
+                    if snapshot is not None:
+                        return snapshot[0], snapshot[1], 200
+
+                    response = self.app.make_response(self.views[path](*args, **kwargs))
+                    if response.status_code == 200:
+                        self.publish(path, response.get_data(), response.mimetype)
+                    return response.get_data(), response.mimetype, response.status_code
+
+            time.sleep(WAIT_INTERVAL)
+            snapshot = self.get(path)
+            if snapshot is not None:
+                return snapshot[0], snapshot[1], 200
+
+    def refresh_due(self):
+        """Refresh snapshots older than the refresh interval if no other worker is"""
+        with self._refresh_lock() as acquired:
+            if not acquired:
+                return
+            for path in self.views:
+                snapshot = self.get(path)
+                if snapshot is None or time.time() - snapshot[2] >= self.refresh_interval:
+                    self.refresh(path)
+
+    def _revalidate(self):
+        """Refresh in the background unless this process already is"""
+        if not self._revalidating.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh_due()
+            finally:
+                self._revalidating.release()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh_due()
+            except Exception:
+                logger.exception("Snapshot refresher failed")
+            time.sleep(self.check_interval)
+
+    def start(self):
+        """Start refreshing snapshots on a schedule in this process"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='snapshots', daemon=True)
+            self._thread.start()
+
+    def serve(self, path):
+        """Decorator serving path from its snapshot when requested as plain JSON without parameters"""
+        def decorator(f):
+            # Refreshes bypass the response cache
+            self.views[path] = getattr(f, 'uncached', f)
+
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                # Snapshots are stored as default JSON
+                if request.args or wants_msgpack():
+                    return f(*args, **kwargs)
+
+                snapshot = self.get(path)
+                if snapshot is None:
+                    # Nothing published yet, compute it once on the request path,
+                    # concurrent requests of this worker share the result
+                    body, mimetype, status = self._inflight.do(path, partial(self._compute_missing, path, args, kwargs))
+                    response = Response(body, status=status, mimetype=mimetype)
+                    response.headers['X-Snapshot-Age'] = '0'
+                    # The format served depends on Accept
+                    response.vary.add('Accept')
+                    return response
+
+                body, mimetype, created = snapshot
+                age = time.time() - created
+                if age >= self.refresh_interval:
+                    self._revalidate()
+
+                response = Response(body, mimetype=mimetype)
+                response.headers['X-Snapshot-Age'] = str(int(age))
+                response.vary.add('Accept')
+                return response
+
+            return decorated_function
+        return decorator
@@ -0,0 +1,206 @@
+"""Local stand-in for The Graph replaying recorded subgraph responses
+
+Record with SUBGRAPH_RECORD_PATH set, then serve the recordings with
+
+    python -m v3data.standin recordings.jsonl --port 8000 --latency 150 --jitter 50
+
+and point the service at it with SUBGRAPH_STANDIN_URL=http://localhost:8000.
+"""
+import argparse
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from flask import Flask, request
+
+from v3data.recording import normalize_query, read_recordings
+
+FILTER_PATTERN = re.compile(r'(\w+)_(gte|gt|lte|lt)\s*:\s*\$(\w+)')
+COMPARISONS = {
+    'gt': lambda value, bound: value > bound,
+    'gte': lambda value, bound: value >= bound,
+    'lt': lambda value, bound: value < bound,
+    'lte': lambda value, bound: value <= bound
+}
+
+
+def _comparable(value):
+    """Numbers (also as strings) compare numerically, anything else as text"""
+    if isinstance(value, (int, float)):
+        return (0, value)
+    try:
+        return (0, int(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return (0, float(value))
+    except (TypeError, ValueError):
+        return (1, str(value))
+
+
+def _arguments(query, entity):
+    """Argument text of the top level entity field in query"""
+    # Fields start after the operation definition
+    match = re.compile(rf'\b{entity}\s*\(').search(query, query.find('{') + 1)
+    if not match:
+        return ''
+    depth, start = 0, match.end() - 1
+    for i in range(start, len(query)):
+        if query[i] == '(':
+            depth += 1
+        elif query[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return query[start + 1:i]
+    return ''
+
+
+class Pagination:
+    """first/orderBy/orderDirection and variable bound *_gt style filters of a query"""
+
+    def __init__(self, query, entity):
+        arguments = _arguments(query, entity)
+        self.entity = entity
+        self.filters = [
+            (field, comparison, variable) for field, comparison, variable in FILTER_PATTERN.findall(arguments)
+        ]
+        self.variables = {variable for _, _, variable in self.filters}
+        self.first = self._argument(arguments, 'first')
+        self.order_by = self._argument(arguments, 'orderBy')
+        self.order_direction = self._argument(arguments, 'orderDirection')
+
+    @staticmethod
+    def _argument(arguments, name):
+        match = re.search(rf'\b{name}\s*:\s*(\$?\w+)', arguments)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _resolve(value, variables):
+        if value is not None and value.startswith('$'):
+            return variables.get(value[1:])
+        return value
+
+    def page(self, entities, variables):
+        """Entities of the page requested with variables"""
+        for field, comparison, variable in self.filters:
+            if variables.get(variable) is None:
+                continue
+            bound = _comparable(variables[variable])
+            entities = [
+                entity for entity in entities
+                if COMPARISONS[comparison](_comparable(entity.get(field)), bound)
+            ]
+
+        order_by = self._resolve(self.order_by, variables)
+        if order_by:
+            descending = self._resolve(self.order_direction, variables) == 'desc'
+            entities = sorted(entities, key=lambda entity: _comparable(entity.get(order_by)), reverse=descending)
+
+        first = self._resolve(self.first, variables)
+        return entities[:int(first)] if first is not None else entities
+
+
+class Recordings:
+    """Recorded responses by subgraph path, query and variables
+
+    A request recorded with the same variables gets the recorded response.
+    Otherwise the entities of all recorded pages of the query (with the
+    same non pagination variables) are pooled, and filtered, sorted and
+    cut to the requested page the way the subgraph would. Only the top
+    level entity is paginated.
+    """
+
+    def __init__(self, recordings):
+        self.exact = {}
+        self.by_query = defaultdict(list)
+        for recording in recordings:
+            path = urlparse(recording['url']).path
+            query = normalize_query(recording['query'])
+            variables = recording.get('variables') or {}
+            self.exact[(path, query, self._key(variables))] = recording['response']
+            self.by_query[(path, query)].append((variables, recording['response']))
+        self._pooled = {}
+
+    @staticmethod
+    def _key(variables, exclude=()):
+        return json.dumps({k: v for k, v in variables.items() if k not in exclude}, sort_keys=True)
+
+    def _pooled_entities(self, path, query, variables):
+        recorded = self.by_query.get((path, query))
+        if not recorded:
+            return None, None
+
+        data = next((response['data'] for _, response in recorded if response.get('data')), None)
+        if not data:
+            return None, None
+        entity = next(iter(data))
+        pagination = Pagination(query, entity)
+
+        # Variables passed but not used by the query do not matter either
+        used = set(re.findall(r'\$(\w+)', query))
+        exclude = pagination.variables | (set(variables) - used)
+        for recorded_variables, _ in recorded:
+            exclude |= set(recorded_variables) - used
+
+        key = (path, query, self._key(variables, exclude))
+        if key not in self._pooled:
+            entities = {}
+            for recorded_variables, response in recorded:
+                if self._key(recorded_variables, exclude) != key[2]:
+                    continue
+                for item in (response.get('data') or {}).get(entity) or []:
+                    entities[item.get('id', json.dumps(item, sort_keys=True))] = item
+            self._pooled[key] = list(entities.values()) if entities else None
+
+        return pagination, self._pooled[key]
+
+    def response(self, path, query, variables):
+        query = normalize_query(query)
+        variables = variables or {}
+
+        response = self.exact.get((path, query, self._key(variables)))
+        if response is not None:
+            return response
+
+        pagination, entities = self._pooled_entities(path, query, variables)
+        if entities is None:
+            return {"errors": [{"message": f"No recording for query on {path}"}]}
+
+        return {"data": {pagination.entity: pagination.page(entities, variables)}}
+
+
+def create_app(recordings, latency=0, jitter=0):
+    """Stand-in subgraph server, latency and jitter in milliseconds"""
+    app = Flask(__name__)
+    recordings = Recordings(recordings)
+
+    @app.route('/<path:path>', methods=['POST'])
+    def graphql(path):
+        delay = latency + random.uniform(-jitter, jitter)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        params = request.get_json(force=True)
+        return recordings.response(f"/{path}", params['query'], params.get('variables'))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded subgraph responses")
+    parser.add_argument('recordings', help="JSONL file written with SUBGRAPH_RECORD_PATH")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0, help="Added to every response, in ms")
+    parser.add_argument('--jitter', type=float, default=0, help="Latency varies by up to this much, in ms")
+    args = parser.parse_args()
+
+    app = create_app(read_recordings(args.recordings), args.latency, args.jitter)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import time
+
+from v3data.config import SWAP_STORE_PATH, SWAP_STORE_RETENTION_DAYS
+
+# Rows read at a time when streaming a window
+CHUNK_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS swaps (
+    pool TEXT NOT NULL,
+    id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    sqrtPriceX96 TEXT NOT NULL,
+    PRIMARY KEY (pool, id)
+);
+CREATE INDEX IF NOT EXISTS swaps_pool_timestamp ON swaps (pool, timestamp);
+CREATE TABLE IF NOT EXISTS coverage (
+    pool TEXT PRIMARY KEY,
+    start INTEGER NOT NULL,
+    watermark INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS windows (
+    pool TEXT PRIMARY KEY,
+    span INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pools (
+    pool TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SwapStore:
+    """Local copy of swap price series per pool
+
+    For every pool the store covers [start, watermark], with watermark the
+    timestamp of the latest stored swap. Later swaps can only have the same
+    or a later timestamp, so syncing only asks the subgraph for swaps from
+    the watermark onwards (and for any older range not covered yet).
+    Swaps are kept for retention_days, or for the longest window asked of
+    the pool if that is longer.
+    """
+
+    def __init__(self, path=SWAP_STORE_PATH, retention_days=SWAP_STORE_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._initialised = False
+
+    def _connect(self):
+        if not self._initialised:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        connection = sqlite3.connect(self.path, timeout=30)
+
+        if not self._initialised:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._initialised = True
+
+        return connection
+
+    def _coverage(self, connection, pool_address):
+        row = connection.execute(
+            "SELECT start, watermark FROM coverage WHERE pool = ?", (pool_address,)
+        ).fetchone()
+        return row if row else (None, None)
+
+    def _insert(self, connection, pool_address, swaps):
+        connection.executemany(
+            "INSERT OR IGNORE INTO swaps (pool, id, timestamp, sqrtPriceX96) VALUES (?, ?, ?, ?)",
+            [(pool_address, swap['id'], int(swap['timestamp']), swap['sqrtPriceX96']) for swap in swaps]
+        )
+
+    def _update_coverage(self, connection, pool_address, start, watermark):
+        connection.execute(
+            """
+            INSERT INTO coverage (pool, start, watermark) VALUES (?, ?, ?)
+            ON CONFLICT (pool) DO UPDATE SET
+                start = min(start, excluded.start),
+                watermark = max(watermark, excluded.watermark)
+            """,
+            (pool_address, start, watermark)
+        )
+
+    def _window_span(self, connection, pool_address, span):
+        """Longest window in seconds asked of the pool, including span"""
+        connection.execute(
+            """
+            INSERT INTO windows (pool, span) VALUES (?, ?)
+            ON CONFLICT (pool) DO UPDATE SET span = max(span, excluded.span)
+            """,
+            (pool_address, span)
+        )
+        return connection.execute("SELECT span FROM windows WHERE pool = ?", (pool_address,)).fetchone()[0]
+
+    def _prune(self, connection, pool_address, cutoff):
+        connection.execute("DELETE FROM swaps WHERE pool = ? AND timestamp < ?", (pool_address, cutoff))
+        connection.execute("UPDATE coverage SET start = max(start, ?) WHERE pool = ?", (cutoff, pool_address))
+
+    def sync(self, pool_address, timestamp_start, fetch_pages):
+        """Bring the local copy up to date from timestamp_start
+
+        fetch_pages(pool_address, start, end) yields pages of swaps with
+        start <= timestamp < end in timestamp order. Every page is stored as
+        it arrives, so a range is never held in memory as a whole.
+        """
+        now = int(time.time())
+        timestamp_end = now + 1
+        connection = self._connect()
+        try:
+            # Never pruned below the window, so it is not fetched again next time
+            with connection:
+                span = self._window_span(connection, pool_address, now - int(timestamp_start))
+            cutoff = now - max(self.retention_days * 24 * 60 * 60, span)
+
+            start, watermark = self._coverage(connection, pool_address)
+
+            if start is None:
+                ranges = [(timestamp_start, timestamp_end)]
+                start = watermark = timestamp_start
+            elif timestamp_start < start:
+                ranges = [(timestamp_start, start), (watermark, timestamp_end)]
+            else:
+                ranges = [(watermark, timestamp_end)]
+
+            for range_start, range_end in ranges:
+                for swaps in fetch_pages(pool_address, range_start, range_end):
+                    with connection:
+                        self._insert(connection, pool_address, swaps)
+                        # Pages of the range from the watermark come in order,
+                        # so everything up to the last stored swap is covered
+                        watermark = max(watermark, max(int(swap['timestamp']) for swap in swaps))
+                        self._update_coverage(connection, pool_address, start, watermark)
+                # An older range only counts as covered once fully stored
+                start = min(start, range_start)
+                with connection:
+                    self._update_coverage(connection, pool_address, start, watermark)
+
+            with connection:
+                self._prune(connection, pool_address, cutoff)
+        finally:
+            connection.close()
+
+    def iter_window(self, pool_address, timestamp_start, fetch_pages, chunk_size=CHUNK_SIZE):
+        """(timestamp, sqrtPriceX96) rows from timestamp_start ordered by
+        timestamp, chunk by chunk, syncing the store first"""
+        self.sync(pool_address, timestamp_start, fetch_pages)
+
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                """
+                SELECT timestamp, sqrtPriceX96 FROM swaps
+                WHERE pool = ? AND timestamp >= ?
+                ORDER BY timestamp, id
+                """,
+                (pool_address, timestamp_start)
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            connection.close()
+
+    def pool(self, pool_address, fetch_pool):
+        """Pool metadata, fetched once since it never changes"""
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT data FROM pools WHERE pool = ?", (pool_address,)).fetchone()
+            if row:
+                return json.loads(row[0])
+
+            pool = fetch_pool(pool_address)
+            if pool:
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO pools (pool, data) VALUES (?, ?)",
+                        (pool_address, json.dumps(pool))
+                    )
+            return pool
+        finally:
+            connection.close()
@@ -0,0 +1,189 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+import orjson
+
+from v3data import session
+from v3data.process import after_fork
+from v3data.config import TOKEN_LIST_URL, TOKEN_LIST_PATH, TOKEN_LIST_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class TokenIndex:
+    """Token addresses by symbol, looked up exactly, ignoring case or by prefix"""
+
+    def __init__(self, tokens):
+        self.exact = {}
+        self.folded = {}
+        for token in tokens:
+            symbol, address = token['symbol'], token['address']
+            self.exact.setdefault(symbol, []).append(address)
+            addresses = self.folded.setdefault(symbol.upper(), [])
+            if address not in addresses:
+                addresses.append(address)
+        self.sorted_symbols = sorted(self.folded)
+
+    def addresses(self, symbol):
+        """Addresses of tokens with symbol, matched exactly first then ignoring case"""
+        addresses = self.exact.get(symbol)
+        if addresses is None:
+            addresses = self.folded.get(symbol.upper(), [])
+        return list(addresses)
+
+    def search(self, prefix, limit=None):
+        """Addresses of all symbols starting with prefix (ignoring case), in symbol order"""
+        prefix = prefix.upper()
+        start = bisect.bisect_left(self.sorted_symbols, prefix)
+        results = {}
+        for symbol in self.sorted_symbols[start:]:
+            if not symbol.startswith(prefix) or (limit is not None and len(results) >= limit):
+                break
+            results[symbol] = list(self.folded[symbol])
+        return results
+
+
+class TokenRegistry:
+    """Token list downloaded once and kept on disk
+
+    The list is stored at path along with its ETag/Last-Modified, and
+    revalidated with a conditional request once it is older than
+    refresh_interval, in the background so lookups never wait on it.
+    The disk copy is shared by all workers on the host and keeps being
+    served, however old, while the source is unreachable.
+    """
+
+    def __init__(self, url=TOKEN_LIST_URL, path=TOKEN_LIST_PATH, refresh_interval=TOKEN_LIST_REFRESH_INTERVAL):
+        self.url = url
+        self.path = path
+        self.meta_path = f"{path}.meta"
+        self.refresh_interval = refresh_interval
+        self._index = None
+        self._loaded_mtime = None
+        self._checked = 0
+        self._lock = threading.Lock()
+        self._revalidating = threading.Lock()
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._revalidating = threading.Lock()
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, path, content):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+
+    def _write_meta(self, meta):
+        self._write(self.meta_path, json.dumps(meta).encode())
+
+    def _load_disk(self):
+        """Index the disk copy if it changed since last loaded, False if there is none"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._loaded_mtime:
+                return True
+            with open(self.path, 'rb') as list_file:
+                tokens = orjson.loads(list_file.read())['tokens']
+        except (OSError, ValueError, KeyError):
+            return False
+
+        self._index = TokenIndex(tokens)
+        self._loaded_mtime = mtime
+        return True
+
+    def refresh(self):
+        """Revalidate the disk copy against the source, True if it is current"""
+        meta = self._read_meta()
+        if self._load_disk() and time.time() - meta.get('checked', 0) < self.refresh_interval:
+            # Another worker revalidated recently
+            self._checked = meta['checked']
+            return True
+
+        headers = {}
+        if self._index is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = session.get(self.url, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+                tokens = orjson.loads(response.content)['tokens']
+        except Exception:
+            logger.exception(f"Failed to refresh token list from {self.url}")
+            # Retry after another interval rather than on every lookup
+            self._checked = time.time()
+            return False
+
+        if response.status_code != 304:
+            self._write(self.path, response.content)
+            self._index = TokenIndex(tokens)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+            meta = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+
+        self._checked = meta['checked'] = time.time()
+        self._write_meta(meta)
+        return True
+
+    def _revalidate(self):
+        """Refresh in the background unless this process already is"""
+        if not self._revalidating.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                with self._lock:
+                    self.refresh()
+            finally:
+                self._revalidating.release()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def load(self):
+        """Index the disk copy without going to the source, False if there is none"""
+        with self._lock:
+            return self._load_disk()
+
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self.refresh()
+            if self._index is None:
+                raise RuntimeError(f"Token list unavailable from {self.url} and no copy at {self.path}")
+        elif time.time() - self._checked >= self.refresh_interval:
+            self._revalidate()
+
+        return self._index
+
+    def addresses(self, symbol):
+        return self.index().addresses(symbol)
+
+    def search(self, prefix, limit=None):
+        return self.index().search(prefix, limit)
+
+    def token_addresses(self):
+        """Symbol to addresses map of the whole list"""
+        return {symbol: list(addresses) for symbol, addresses in self.index().exact.items()}
+
+
+token_registry = TokenRegistry()
+after_fork(token_registry.reset_after_fork)
@@ -1,12 +1,14 @@
-import numpy as np
 from datetime import timedelta
-from pandas import DataFrame
 
 from v3data import VisorClient
-from v3data.visr import VisrData
+from v3data.visr import VisrPrice
 from v3data.hypervisor import HypervisorData
 from v3data.utils import timestamp_ago
 from v3data.config import EXCLUDED_HYPERVISORS
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
 
 class TopLevelData:
@@ -128,10 +130,9 @@ class TopLevelData:
         return self._all_stats()
 
     def recent_fees(self, hours=24):
-        visr = VisrData()
-        visr_price = visr.price_usd()
+        visr_price = VisrPrice().output()['visr_in_usdc']
         data = self.get_recent_rebalance_data(hours)
-        df_fees = DataFrame(data, dtype=np.float64)
+        df_fees = pd.DataFrame(data, dtype=np.float64)
 
         df_fees['grossFeesVISR'] = df_fees.grossFeesUSD / visr_price
         df_fees['protocolFeesVISR'] = df_fees.protocolFeesUSD / visr_price
@@ -1,5 +1,11 @@
 import datetime
 
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+Q192 = 2 ** 192
+
 
 def timestamp_to_date(timestamp, format=None):
     """Converts UNIX timestamp to ISO date"""
@@ -46,3 +52,55 @@ def sqrtPriceX96_to_priceDecimal(sqrtPriceX96, token0_decimal, token1_decimal):
 
 def tick_to_priceDecimal(tick, token0_decimal, token1_decimal):
     return 1.0001 ** tick * 10 ** (token0_decimal - token1_decimal)
+
+
+def sqrtPriceX96_to_priceDecimal_array(sqrtPricesX96, token0_decimal, token1_decimal, exact=False):
+    """Array version of sqrtPriceX96_to_priceDecimal
+
+    The default path squares float64 values like the scalar version, which
+    rounds 160 bit prices to 53 bits before squaring, a relative error of
+    about 1e-16. With exact=True the integer prices are squared and scaled
+    as Python integers and only the final quotient is rounded to float,
+    which is not vectorized and several times slower.
+    """
+    if exact:
+        decimal_shift = token0_decimal - token1_decimal
+        numerator = 10 ** max(decimal_shift, 0)
+        denominator = Q192 * 10 ** max(-decimal_shift, 0)
+        return np.fromiter(
+            (_square(int(sqrtPriceX96)) * numerator / denominator for sqrtPriceX96 in sqrtPricesX96),
+            dtype=np.float64,
+            count=len(sqrtPricesX96)
+        )
+
+    if isinstance(sqrtPricesX96, (list, tuple)) and sqrtPricesX96 and isinstance(sqrtPricesX96[0], str):
+        # Integer strings from the subgraph, parsing them as int is several
+        # times faster than float(str) and rounds the same
+        sqrtPricesX96 = np.fromiter(map(float, map(int, sqrtPricesX96)), dtype=np.float64, count=len(sqrtPricesX96))
+    sqrtPricesX96 = np.asarray(sqrtPricesX96, dtype=np.float64)
+    return ((sqrtPricesX96 ** 2) / float(Q192)) * float(10 ** (token0_decimal - token1_decimal))
+
+
+def tick_to_priceDecimal_array(ticks, token0_decimal, token1_decimal):
+    """Array version of tick_to_priceDecimal"""
+    ticks = np.asarray(ticks, dtype=np.float64)
+    return np.power(1.0001, ticks) * float(10 ** (token0_decimal - token1_decimal))
+
+
+def _square(value):
+    return value * value
+
+
+def parse_period_days(period_days, max_days=365):
+    """Parses comma separated day counts (e.g. "3,14,90") into periods keyed like "3d" """
+    if not period_days:
+        return None
+
+    periods = {}
+    for days in period_days.split(','):
+        days = int(days)
+        if not 0 < days <= max_days:
+            raise ValueError(f"Period must be between 1 and {max_days} days")
+        periods[f"{days}d"] = days
+
+    return periods
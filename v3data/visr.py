@@ -1,11 +1,15 @@
-import numpy as np
 from datetime import timedelta
-from pandas import DataFrame
 
 from v3data import VisorClient, UniswapV3Client
+from v3data.memo import memoized
 from v3data.config import DEFAULT_TIMEZONE
 from v3data.utils import timestamp_to_date, sqrtPriceX96_to_priceDecimal, timestamp_ago
 from v3data.constants import DAYS_IN_PERIOD
+from v3data.returns import PrefixSum, WindowReturns
+from v3data.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
 
 class VisrData:
@@ -77,32 +81,35 @@ class VisrCalculations(VisrData):
             "totalSupply": int(data['totalSupply']) / self.decimal_factor
         }
 
-    def visr_yield(self, get_data=True):
+    def visr_yield(self, get_data=True, periods=DAYS_IN_PERIOD):
         """Gets estimates such as APY, visor distributed"""
 
         if get_data:
             self._get_data()
 
-        df_data = DataFrame(self.data['visrTokenDayDatas'], dtype=np.float64)
-        df_data.totalStaked = int(self.data['rewardHypervisor']['totalVisr'])
-        df_data['dailyYield'] = df_data.distributed / df_data.totalStaked
-        df_data = df_data.sort_values('date')
+        day_datas = sorted(self.data['visrTokenDayDatas'], key=lambda day: float(day['date']))
+        distributed = np.array([float(day['distributed']) for day in day_datas])
+        distributed_usd = np.array([float(day['distributedUSD']) for day in day_datas])
+        total_staked = int(self.data['rewardHypervisor']['totalVisr'])
+
+        daily_yields = WindowReturns(distributed / total_staked)
+        total_distributed = PrefixSum(distributed)
+        total_distributed_usd = PrefixSum(distributed_usd)
 
         results = {}
-        for period, days in DAYS_IN_PERIOD.items():
-            df_period = df_data.tail(days).copy()
-            n_days = len(df_period)
+        for period, days in periods.items():
+            start = max(len(day_datas) - days, 0)
+            n_days = len(day_datas) - start
             annual_scaling_factor = 365 / n_days
 
-            df_period['cumReturn'] = (1 + df_period['dailyYield']).cumprod() - 1
-            period_yield = df_period['cumReturn'].iat[-1]
+            period_yield = daily_yields.compound(start)
 
             results[period] = {}
             results[period]['yield'] = period_yield
             results[period]['apr'] = period_yield * annual_scaling_factor
             results[period]['apy'] = (1 + period_yield / n_days) ** 365 - 1  # compounded daily
-            results[period]['estimatedAnnualDistribution'] = (df_period.distributed.sum() / self.decimal_factor) * annual_scaling_factor
-            results[period]['estimatedAnnualDistributionUSD'] = df_period.distributedUSD.sum() * annual_scaling_factor
+            results[period]['estimatedAnnualDistribution'] = float(total_distributed.sum(start) / self.decimal_factor) * annual_scaling_factor
+            results[period]['estimatedAnnualDistributionUSD'] = float(total_distributed_usd.sum(start)) * annual_scaling_factor
 
         return results
 
@@ -142,8 +149,8 @@ class VisrYield(VisrCalculations):
     def __init__(self, days=30):
         super().__init__(days=days)
 
-    def output(self):
-        return self.visr_yield(get_data=True)
+    def output(self, periods=DAYS_IN_PERIOD):
+        return self.visr_yield(get_data=True, periods=periods)
 
 
 class VisrDistribution(VisrCalculations):
@@ -198,11 +205,15 @@ class VisrPriceData:
         }
         """
         variables = {"id": self.pool}
-        self. data = self.uniswap_client.query(query, variables)['data']
+        self.data = self.uniswap_client.query(query, variables)['data']
 
 
 class VisrPrice(VisrPriceData):
     def output(self):
+        # Shared by every calculator needing the price within a request
+        return dict(memoized(('visr_price', self.pool), self._output))
+
+    def _output(self):
         self._get_data()
         sqrt_priceX96 = float(self.data['pool']['sqrtPrice'])
         decimal0 = int(self.data['pool']['token0']['decimals'])
@@ -261,7 +272,7 @@ class ProtocolFeesCalculations(ProtocolFeesData):
         if not rebalances:
             return 0
 
-        df_rebalances = DataFrame(rebalances, dtype=np.float64)
+        df_rebalances = pd.DataFrame(rebalances, dtype=np.float64)
 
         visr_price = VisrPrice()
         visr_in_usd = visr_price.output()['visr_in_usdc']
@@ -0,0 +1,125 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from v3data.config import WARMUP_ROUTES, WARMUP_MARKER_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """Requests a list of routes once per host at boot, then reports ready
+
+    The first worker to take the host wide lock requests every route
+    through the app, filling the snapshots, the response cache and the
+    data caches behind them, and writes a marker with the results. The
+    other workers wait for the marker instead of requesting the routes
+    again. If the warming worker dies the lock is released and the next
+    worker warms up. The marker is removed when the server starts.
+    """
+
+    def __init__(self, app=None, routes=WARMUP_ROUTES, marker_path=WARMUP_MARKER_PATH, poll_interval=1):
+        self.app = app
+        self.routes = routes
+        self.marker_path = marker_path
+        self.lock_path = f"{marker_path}.lock"
+        self.poll_interval = poll_interval
+        self.ready = threading.Event()
+        self.marker = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.marker_path) or '.', exist_ok=True)
+
+    def reset_after_fork(self):
+        self.ready = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @contextmanager
+    def _lock(self):
+        """Yields True if this process holds the host wide warm-up lock"""
+        with open(self.lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_marker(self):
+        try:
+            with open(self.marker_path) as marker_file:
+                return json.load(marker_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_marker(self, marker):
+        temp_path = f"{self.marker_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as temp_file:
+            json.dump(marker, temp_file)
+        os.replace(temp_path, self.marker_path)
+
+    def _request_routes(self):
+        client = self.app.test_client()
+        results = {}
+        for route in self.routes:
+            start = time.time()
+            try:
+                status = client.get(route).status_code
+            except Exception:
+                logger.exception(f"Warm-up request to {route} failed")
+                status = None
+            results[route] = {"status": status, "seconds": round(time.time() - start, 3)}
+            logger.info(f"Warmed up {route} ({status}) in {results[route]['seconds']:.1f}s")
+        return results
+
+    def run(self):
+        """Warm up or wait for the worker that is, then report ready"""
+        while True:
+            with self._lock() as acquired:
+                if acquired:
+                    marker = self._read_marker()
+                    if marker is None:
+                        start = time.time()
+                        marker = {
+                            "pid": os.getpid(),
+                            "routes": self._request_routes(),
+                            "seconds": round(time.time() - start, 3),
+                            "completed": time.time()
+                        }
+                        self._write_marker(marker)
+                    break
+            time.sleep(self.poll_interval)
+
+        self.marker = marker
+        self.ready.set()
+
+    def start(self, then=None):
+        """Warm up in the background once per process, then call then"""
+        def run():
+            try:
+                self.run()
+            except Exception:
+                logger.exception("Warm-up failed, reporting ready with cold caches")
+                self.ready.set()
+            if then is not None:
+                then()
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=run, name='warmup', daemon=True)
+                self._thread.start()
+
+    def status(self):
+        return {
+            "ready": self.ready.is_set(),
+            "warmup": self.marker
+        }